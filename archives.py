@@ -0,0 +1,158 @@
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import quote
+
+import requests
+from github.Consts import DEFAULT_USER_AGENT
+from requests.exceptions import RequestException
+
+import global_variables as gv
+from blob_cache import blob_cache
+from connection import open_stream
+from funcs import get_requester, resolve_target, read_setting, is_unchanged, remember_blob_sha, record_write, \
+    CHUNK_SIZE
+from global_variables import GeneralException, DOWNLOADED_DIRECTORY_PATH
+from metrics import metrics
+
+
+class ArchiveReader:
+    # the archive is read straight from the response, so it is never stored as a whole
+    def __init__(self, response: requests.Response):
+        self.response = response
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.response.raw.read(None if size < 0 else size, decode_content=True)
+        metrics.add_downloaded_bytes(len(chunk))
+
+        return chunk
+
+
+def open_archive_stream(owner_name: str, repo_name: str, ref: str) -> requests.Response:
+    requester = get_requester(owner_name, repo_name)
+    headers = {'User-Agent': DEFAULT_USER_AGENT}
+
+    if requester.auth is not None:
+        headers['Authorization'] = f'{requester.auth.token_type} {requester.auth.token}'
+
+    # the api redirects to the archive host, requests drops the token when it follows to another host
+    response = open_stream(f'{requester.base_url}/repos/{owner_name}/{repo_name}/tarball/{quote(ref)}', headers)
+
+    if response.status_code != 200:
+        response.close()
+        raise gv.ErrorException(f'Archive of "{owner_name}/{repo_name}" could not be downloaded.')
+
+    return response
+
+
+def write_member(source: BinaryIO, size: int, blob_sha: str | None, targets: list[Path]) -> list[Path] | None:
+    descriptor, temp_path = tempfile.mkstemp(dir=targets[0].parent, prefix=f'.{targets[0].name}.', suffix='.tmp')
+    digest = hashlib.sha1(f'blob {size}\0'.encode())
+
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                file.write(chunk)
+
+        # export-subst and export-ignore attributes make an archive differ from the blob, such files are
+        # downloaded one by one
+        if blob_sha is not None and digest.hexdigest() != blob_sha:
+            return None
+
+        # targets which already hold the content keep their modification time
+        unchanged = [target for target in targets if is_unchanged(target, digest.hexdigest())]
+
+        for target in targets[1:]:
+            if target not in unchanged:
+                descriptor, copy_path = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.tmp')
+                os.close(descriptor)
+                shutil.copyfile(temp_path, copy_path)
+                os.replace(copy_path, target)
+
+        if targets[0] not in unchanged:
+            os.replace(temp_path, targets[0])
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+    for target in targets:
+        if target not in unchanged:
+            remember_blob_sha(target, digest.hexdigest())
+            record_write(target)
+
+    cache_size = read_setting('blob_cache_size')
+    if cache_size > 0:
+        blob_cache.save(digest.hexdigest(), targets[0], cache_size)
+
+    return unchanged
+
+
+def extract_paths(archive: BinaryIO, targets: dict[str, tuple[str | None, list[Path]]],
+                  extracted: dict[str, list[Path]] | None = None) -> dict[str, list[Path]]:
+    # targets hold the expected blob SHA and the local files of every wanted path of the repository, the
+    # extracted paths map to their targets which were left untouched and are kept even when the stream breaks off
+    remaining = set(targets)
+    extracted = {} if extracted is None else extracted
+
+    with tarfile.open(fileobj=archive, mode='r|*') as tar:
+        for member in tar:
+            if not remaining:
+                break
+
+            # every path is prefixed with a directory named after the repository and the commit
+            path = member.name.split('/', 1)[1] if '/' in member.name else ''
+
+            if not member.isfile() or path not in remaining:
+                continue
+
+            remaining.discard(path)
+            unchanged = write_member(tar.extractfile(member), member.size, *targets[path])
+
+            if unchanged is not None:
+                extracted[path] = unchanged
+
+    return extracted
+
+
+def update_from_archive(owner_name: str, repo_name: str, head: str, files: list[list],
+                        remote_shas: dict[str, str]) -> list[GeneralException | None]:
+    targets = {}
+    for file in files:
+        paths = targets.setdefault(file[3], (remote_shas.get(file[3]), []))[1]
+        if resolve_target(file[4], file[3]) not in paths:
+            paths.append(resolve_target(file[4], file[3]))
+
+    DOWNLOADED_DIRECTORY_PATH.mkdir(exist_ok=True)
+    extracted = {}
+
+    try:
+        response = open_archive_stream(owner_name, repo_name, head)
+
+        try:
+            extract_paths(ArchiveReader(response), targets, extracted)
+        finally:
+            response.close()
+    except (GeneralException, RequestException, tarfile.TarError, OSError):
+        pass
+
+    # files which were not taken from the archive are left to the per file downloads
+    results = []
+    for file in files:
+        location = Path(file[4])
+
+        if file[3] not in extracted:
+            results.append(None)
+        elif resolve_target(file[4], file[3]) in extracted[file[3]]:
+            results.append(gv.UnchangedException(
+                f'File "{file[3]}" already has the same content in "{resolve_target(file[4], file[3]).parent}".'))
+        elif location.exists() and location.is_dir():
+            results.append(gv.SuccessException(f'File "{file[3]}" was downloaded into "{location}".'))
+        else:
+            results.append(gv.InfoException(
+                f'Location "{location}" does not exist, file was was downloaded into "{DOWNLOADED_DIRECTORY_PATH}".'))
+
+    return results
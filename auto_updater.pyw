@@ -1,24 +1,31 @@
+import threading
 import time
 from datetime import datetime
 
-from github import Github, BadCredentialsException
+from github import BadCredentialsException
 
-from funcs import read_tracked_files, read_credentials
-from global_variables import AUTH_FILE_PATH, LOG_PATH, GeneralException
-from main import download_file, check_download
+import global_variables as gv
+from budget import budget
+from funcs import read_credentials, read_setting, create_clients
+from global_variables import AUTH_FILE_PATH, LOG_PATH
+from metadata import get_login
+from metrics import metrics, MetricsServer
+from scheduler import read_due_tracked_files, reschedule_tracked_files, seconds_until_next_due
+from trees import expand_due_tracked_trees
+from updater import update_tracked_files
+from webhook import WebhookServer
 
-git = Github()
+update_lock = threading.Lock()
 
 
 def run() -> None:
+    # files are polled as soon as they are due instead of all of them once per 15 minutes
     while True:
         try:
             auto_update_files()
-            log('Files were updated.')
         except ConnectionError:
             log('No connection with Github.')
-        time.sleep(900)  # 15 minutes
-        # time.sleep(15)
+        time.sleep(seconds_until_next_due())
 
 
 def check_run() -> bool:
@@ -26,9 +33,9 @@ def check_run() -> bool:
         return False
 
     try:
-        global git
-        git = Github(read_credentials())
-        git.get_user().login
+        # every token of the credentials gets a client, requests are spread over them by owner and remaining quota
+        gv.git = create_clients(read_credentials())
+        get_login()
     except BadCredentialsException:
         log('Invalid token was passed.')
         return False
@@ -40,20 +47,81 @@ def check_run() -> bool:
 
 
 def auto_update_files() -> None:
+    # members which appeared upstream are due right away, so they are downloaded in this cycle
+    with update_lock:
+        for message in expand_due_tracked_trees():
+            log(str(message))
+
+    files = read_due_tracked_files()
+
+    if not files:
+        return
+
+    update_files(files)
+
+
+def update_pushed_files(files: list[list]) -> None:
     try:
-        files = read_tracked_files()
-    except FileNotFoundError:
+        update_files(files)
+    except Exception as e:
+        log(f'Pushed files were not updated: {e}')
+
+
+def start_webhook() -> None:
+    port = read_setting('webhook_port')
+
+    if not port:
         return
 
-    if not files:
+    if not read_setting('webhook_secret'):
+        log('Webhook receiver was not started, "webhook_secret" is not set.')
         return
 
-    for file in files:
-        if check_download(file[0], file[1], file[2], file[3], file[4]):
-            try:
-                download_file(file[0], file[1], file[2], file[3], file[4])
-            except GeneralException:
-                pass
+    server = WebhookServer(read_setting('webhook_host'), port, read_setting('webhook_secret'), update_pushed_files)
+    server.start()
+    log(f'Webhook receiver is listening on {read_setting("webhook_host")}:{port}.')
+
+
+def start_metrics() -> None:
+    port = read_setting('metrics_port')
+
+    if not port:
+        return
+
+    MetricsServer(read_setting('metrics_host'), port).start()
+    log(f'Metrics are served on http://{read_setting("metrics_host")}:{port}/metrics and /metrics.json.')
+
+
+def update_files(files: list[list]) -> None:
+    # pushed files and due files are never updated at the same time
+    with update_lock:
+        process_files(files)
+
+
+def process_files(files: list[list]) -> None:
+    deferred = []
+    results = []
+    start = time.monotonic()
+
+    for file, result in update_tracked_files(files):
+        results.append((file, result))
+
+        if isinstance(result, gv.DeferredException):
+            deferred.append(file)
+        elif isinstance(result, (gv.ErrorException, gv.WarningException)):
+            log(f'{file[3]}: {result}')
+
+    reschedule_tracked_files(results)
+    counts = metrics.record_cycle(results, time.monotonic() - start)
+
+    # cycles in which every file was up to date are not logged
+    if counts['updated'] or counts['unchanged']:
+        log(f'{counts["updated"]} of {counts["checked"]} checked files were updated, '
+            f'{counts["unchanged"]} writes of identical content were avoided.')
+
+    if deferred:
+        log(f'Rate limit budget is exhausted ({budget.remaining} requests left), {len(deferred)} files were deferred '
+            f'until {budget.reset_time()}. The next cycle resumes from "{deferred[0][3]}".')
 
 
 def log(message: str) -> None:
@@ -64,7 +132,9 @@ def log(message: str) -> None:
 if __name__ == '__main__':
     try:
         if check_run():
-            log(f'Logged in as: {git.get_user().login}')
+            log(f'Logged in as: {get_login()}')
+            start_webhook()
+            start_metrics()
             run()
         else:
             log(f'Unable to login.')
@@ -0,0 +1,288 @@
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+RATE_LIMIT_WINDOW = 3600
+
+
+def blob_sha(content: bytes) -> str:
+    return hashlib.sha1(f'blob {len(content)}\0'.encode() + content).hexdigest()
+
+
+def layout(files: int, repos: int) -> dict[str, list[str]]:
+    # the files are spread evenly over the repositories and ten directories in each of them
+    return {f'repo{index}': [f'dir{number % 10}/file{number}.txt' for number in range(index, files, repos)]
+            for index in range(min(files, repos))}
+
+
+class FakeRepository:
+    def __init__(self, owner_name: str, repo_name: str, paths: list[str]):
+        self.owner_name = owner_name
+        self.repo_name = repo_name
+        self.versions = dict.fromkeys(paths, 0)
+        self.head = hashlib.sha1(f'{owner_name}/{repo_name}'.encode()).hexdigest()
+        # every commit remembers its parent and the paths it changed, which is what compare walks
+        self.commits = {self.head: (None, [])}
+
+    def commit(self, paths: list[str]) -> None:
+        for path in paths:
+            self.versions[path] += 1
+
+        head = hashlib.sha1(f'{self.head} {" ".join(paths)}'.encode()).hexdigest()
+        self.commits[head] = (self.head, paths)
+        self.head = head
+
+    def changed_paths(self, base: str, head: str) -> list[str] | None:
+        paths = []
+
+        while head != base:
+            if head not in self.commits or self.commits[head][0] is None:
+                return None
+            head, changed = self.commits[head]
+            paths.extend(changed)
+
+        return list(dict.fromkeys(paths))
+
+
+class FakeGithub(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, rate_limit: int = 5000,
+                 file_size: int = 4096):
+        super().__init__((host, port), FakeGithubHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.file_size = file_size
+        self.lock = threading.Lock()
+        self.repositories = {}
+        self.contents = {}
+        self.remaining = rate_limit
+        self.reset = time.time() + RATE_LIMIT_WINDOW
+        self.calls = {}
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def add_repository(self, owner_name: str, repo_name: str, paths: list[str]) -> None:
+        self.repositories[(owner_name, repo_name)] = FakeRepository(owner_name, repo_name, paths)
+
+    def change_files(self, count: int, seed: int = 0) -> int:
+        # a commit per repository, the changed files are spread randomly over all of them
+        files = [(repository, path) for repository in self.repositories.values() for path in repository.versions]
+        changed = {}
+
+        for repository, path in random.Random(seed).sample(files, min(count, len(files))):
+            changed.setdefault(repository, []).append(path)
+
+        with self.lock:
+            for repository, paths in changed.items():
+                repository.commit(paths)
+
+        return sum(len(paths) for paths in changed.values())
+
+    def content(self, repository: FakeRepository, path: str) -> bytes:
+        key = (repository.owner_name, repository.repo_name, path, repository.versions[path])
+
+        if key not in self.contents:
+            header = f'{"/".join(key[:3])} version {key[3]}\n'.encode()
+            self.contents[key] = (header * (self.file_size // len(header) + 1))[:self.file_size]
+
+        return self.contents[key]
+
+    def archive(self, repository: FakeRepository) -> bytes:
+        # like GitHub, every path of the tarball is prefixed with a directory named after the repository and commit
+        prefix = f'{repository.owner_name}-{repository.repo_name}-{repository.head[:7]}'
+        buffer = io.BytesIO()
+
+        with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+            for path in repository.versions:
+                content = self.content(repository, path)
+                info = tarfile.TarInfo(f'{prefix}/{path}')
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        return buffer.getvalue()
+
+    def count_call(self, kind: str) -> None:
+        with self.lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def take_request(self) -> bool:
+        with self.lock:
+            if time.time() >= self.reset:
+                self.remaining = self.rate_limit
+                self.reset = time.time() + RATE_LIMIT_WINDOW
+
+            if self.remaining <= 0:
+                return False
+
+            self.remaining -= 1
+            return True
+
+    def rate_limit_headers(self) -> dict[str, str]:
+        return {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Remaining': str(self.remaining),
+                'X-RateLimit-Reset': str(int(self.reset)), 'X-RateLimit-Resource': 'core'}
+
+
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    server: FakeGithub
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without this every response waits for a delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = parse_qs(url.query)
+
+        if parts == ['_benchmark', 'state']:
+            self.reply(200, {'calls': self.server.calls, 'remaining': self.server.remaining}, counted=False)
+        elif parts == ['user']:
+            self.reply(200, {'login': 'benchmark', 'url': f'{self.server.url}/users/benchmark'}, 'users')
+        elif parts[0] == 'users' and len(parts) == 2:
+            self.reply(200, {'login': parts[1], 'url': f'{self.server.url}/users/{parts[1]}'}, 'users')
+        elif parts[0] == 'repos' and len(parts) >= 3 and (parts[1], parts[2]) in self.server.repositories:
+            self.repository_endpoint(self.server.repositories[(parts[1], parts[2])], parts[3:], query)
+        else:
+            self.reply(404, {'message': 'Not Found'}, 'other')
+
+    def do_POST(self) -> None:
+        time.sleep(self.server.latency)
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        path = urlparse(self.path).path
+
+        if path == '/graphql':
+            self.reply(200, {'data': self.graphql(body.get('query', ''))}, 'graphql')
+        elif path == '/_benchmark/change':
+            changed = self.server.change_files(body.get('count', 1), body.get('seed', 0))
+            self.reply(200, {'changed': changed}, counted=False)
+        else:
+            self.reply(404, {'message': 'Not Found'}, 'other')
+
+    def repository_endpoint(self, repository: FakeRepository, parts: list[str], query: dict[str, list[str]]) -> None:
+        kind = parts[0] if parts else 'repository'
+        url = f'{self.server.url}/repos/{repository.owner_name}/{repository.repo_name}'
+
+        if not parts:
+            self.reply(200, {'name': repository.repo_name, 'full_name': f'{repository.owner_name}/{repository.repo_name}',
+                             'owner': {'login': repository.owner_name}, 'default_branch': 'main', 'url': url}, kind)
+        elif kind == 'branches' and len(parts) == 2 and parts[1] == 'main':
+            self.reply(200, {'name': 'main', 'commit': {'sha': repository.head, 'url': f'{url}/commits/main'}}, kind)
+        elif kind == 'git' and parts[1:2] == ['trees']:
+            tree = [{'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob_sha(self.server.content(repository, path)),
+                     'size': self.server.file_size, 'url': ''} for path in repository.versions]
+            self.reply(200, {'sha': repository.head, 'url': '', 'tree': tree, 'truncated': False}, 'trees')
+        elif kind == 'compare' and len(parts) == 2:
+            base, head = parts[1].split('...')
+            paths = repository.changed_paths(base, repository.head if head == 'main' else head)
+
+            if paths is None:
+                self.reply(404, {'message': 'Not Found'}, kind)
+                return
+
+            files = [{'filename': path, 'status': 'modified', 'sha': blob_sha(self.server.content(repository, path)),
+                      'additions': 1, 'deletions': 1, 'changes': 2} for path in paths]
+            self.reply(200, {'status': 'ahead' if paths else 'identical', 'files': files, 'commits': [],
+                             'total_commits': 1, 'url': ''}, kind)
+        elif kind == 'tarball':
+            self.reply(200, self.server.archive(repository), kind)
+        elif kind == 'commits':
+            date = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - 86400))
+            self.reply(200, [{'sha': repository.head, 'commit': {'author': {'date': date},
+                                                                  'committer': {'date': date}}}], kind)
+        elif kind == 'contents' and '/'.join(parts[1:]) in repository.versions:
+            path = '/'.join(parts[1:])
+            content = self.server.content(repository, path)
+
+            if 'raw' in self.headers.get('Accept', ''):
+                self.reply(200, content, 'raw')
+            else:
+                self.reply(200, {'type': 'file', 'encoding': 'base64', 'size': len(content), 'name': path.split('/')[-1],
+                                 'path': path, 'sha': blob_sha(content), 'url': f'{url}/contents/{path}',
+                                 'content': base64.b64encode(content).decode()}, kind)
+        else:
+            self.reply(404, {'message': 'Not Found'}, kind)
+
+    def graphql(self, query: str) -> dict:
+        data = {}
+
+        for alias, owner_name, repo_name, body in re.findall(
+                r'(r\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\) \{ (.*?) \}(?= r\d+:| \}$)', query):
+            repository = self.server.repositories.get((owner_name, repo_name))
+
+            if repository is None:
+                data[alias] = None
+                continue
+
+            data[alias] = {'head': {'target': {'oid': repository.head}}}
+            for file_alias, expression in re.findall(r'(f\d+): object\(expression: "([^"]+)"\)', body):
+                path = expression.split(':', 1)[1]
+                data[alias][file_alias] = {'oid': blob_sha(self.server.content(repository, path))} \
+                    if path in repository.versions else None
+
+        return data
+
+    def reply(self, status: int, payload, kind: str | None = None, counted: bool = True) -> None:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+        if counted:
+            self.server.count_call(kind)
+
+        # conditional requests which are not modified do not count against the rate limit, like on GitHub
+        if status == 200 and counted and self.headers.get('If-None-Match') == etag:
+            self.server.count_call('not_modified')
+            self.send(304, b'', {'ETag': etag, **self.server.rate_limit_headers()})
+            return
+
+        if counted and not self.server.take_request():
+            body = json.dumps({'message': 'API rate limit exceeded for user.'}).encode()
+            self.send(403, body, {'Content-Type': 'application/json', **self.server.rate_limit_headers()})
+            return
+
+        self.send(status, body, {'Content-Type': 'application/json', 'ETag': etag, **self.server.rate_limit_headers()})
+
+    def send(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serves a fake GitHub API with generated repositories.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--files', type=int, default=100, help='number of files spread over the repositories')
+    parser.add_argument('--repos', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every request is delayed')
+    parser.add_argument('--rate-limit', type=int, default=5000, help='requests allowed per hour')
+    parser.add_argument('--file-size', type=int, default=4096, help='size of every file in bytes')
+    args = parser.parse_args()
+
+    server = FakeGithub(port=args.port, latency=args.latency, rate_limit=args.rate_limit, file_size=args.file_size)
+    for repo_name, paths in layout(args.files, args.repos).items():
+        server.add_repository('benchmark', repo_name, paths)
+
+    print(f'Fake GitHub API is listening on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import io
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+ENTRY_POINTS = ['main.py', 'auto_updater.pyw', 'gui.py']
+# modules which a headless start should not load
+FRONTEND_MODULES = ['tkinter', 'customtkinter', 'CTkMessagebox', 'tabulate']
+
+# the entry point is executed without its __main__ block, so only the imports are measured
+MEASURE = '''
+import runpy, sys, time
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name='benchmark')
+print(time.perf_counter() - start)
+print(' '.join(name for name in sys.argv[2:] if name in sys.modules))
+'''
+
+
+def measure(tree: Path, entry_point: str, runs: int) -> tuple[float, str]:
+    times = []
+    loaded = ''
+
+    for _ in range(runs):
+        # every run starts a new interpreter, so nothing is imported yet
+        result = subprocess.run([sys.executable, '-c', MEASURE, entry_point, *FRONTEND_MODULES],
+                                cwd=tree, capture_output=True, text=True, check=True)
+        seconds, loaded = (result.stdout.splitlines() + [''])[:2]
+        times.append(float(seconds))
+
+    return statistics.median(times), loaded
+
+
+def export_tree(revision: str, directory: Path) -> Path:
+    archive = subprocess.run(['git', 'archive', revision], cwd=ROOT, capture_output=True, check=True).stdout
+
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+    return directory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measures how long the entry points take to import.')
+    parser.add_argument('--runs', type=int, default=5, help='interpreter starts per entry point, the median is shown')
+    parser.add_argument('--compare-to', metavar='REVISION',
+                        help='git revision which is measured as well, for example the commit before a change')
+    args = parser.parse_args()
+
+    trees = {'working tree': ROOT}
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.compare_to:
+            trees[args.compare_to] = export_tree(args.compare_to, Path(directory))
+
+        print(f'{"entry point":<18}{"tree":<16}{"import (ms)":>12}  frontend modules loaded')
+        for entry_point in ENTRY_POINTS:
+            for name, tree in trees.items():
+                if not (tree / entry_point).exists():
+                    continue
+
+                seconds, loaded = measure(tree, entry_point, args.runs)
+                print(f'{entry_point:<18}{name:<16}{seconds * 1000:>12.1f}  {loaded or "-"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from fake_github import FakeGithub, layout
+
+ROOT = Path(__file__).resolve().parent.parent
+CYCLES = ('cold', 'warm', 'changed')
+
+
+def control(url: str, path: str, payload: dict | None = None) -> dict:
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(f'{url}/_benchmark/{path}', data=data, headers={'Content-Type': 'application/json'})
+
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def peak_memory() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_cycles(url: str, files: int, repos: int, changed: int, directory: Path) -> list[dict]:
+    # runs in a fresh interpreter whose data directory was set to a temporary one
+    sys.path.insert(0, str(ROOT))
+
+    import global_variables as gv
+    import store
+    from funcs import create_clients, read_tracked_files
+    from metrics import metrics, classify_result
+    from updater import update_tracked_files
+
+    gv.git = create_clients([('benchmark', [])], url)
+
+    entries = []
+    for repo_name, paths in layout(files, repos).items():
+        for path in paths:
+            location = directory / repo_name / path.rsplit('/', 1)[0]
+            location.mkdir(parents=True, exist_ok=True)
+            entries.append(('benchmark', repo_name, 'main', path, location))
+    store.save_tracked_files(entries)
+
+    report = []
+    for cycle in CYCLES:
+        if cycle == 'changed':
+            control(url, 'change', {'count': changed})
+
+        requests_before = dict(metrics.requests)
+        remaining_before = control(url, 'state')['remaining']
+        start = time.perf_counter()
+
+        results = {}
+        for file, result in update_tracked_files(read_tracked_files()):
+            results[classify_result(result)] = results.get(classify_result(result), 0) + 1
+
+        duration = time.perf_counter() - start
+        sent = {key: count - requests_before.get(key, 0) for key, count in metrics.requests.items()}
+
+        report.append({
+            'files': files,
+            'cycle': cycle,
+            'seconds': round(duration, 3),
+            'requests': sum(sent.values()),
+            'not_modified': sum(count for (kind, status), count in sent.items() if status == 304),
+            'quota_used': remaining_before - control(url, 'state')['remaining'],
+            'by_kind': {kind: sum(count for (name, status), count in sent.items() if name == kind)
+                        for kind in sorted({kind for kind, status in sent})},
+            'results': results,
+            'peak_memory_mb': peak_memory(),
+        })
+
+    return report
+
+
+def run_scenario(args: argparse.Namespace, files: int) -> list[dict]:
+    server = FakeGithub(latency=args.latency, rate_limit=args.rate_limit, file_size=args.file_size)
+    for repo_name, paths in layout(files, args.repos).items():
+        server.add_repository('benchmark', repo_name, paths)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data = Path(directory) / 'data'
+        data.mkdir()
+        (data / 'settings.json').write_text(json.dumps({'workers': args.workers, 'freshness_backend': args.backend}))
+
+        changed = max(1, round(files * args.change_ratio))
+        result = subprocess.run(
+            [sys.executable, __file__, '--child', server.url, str(files), str(args.repos), str(changed), directory],
+            env={**os.environ, 'GITHUB_DOWNLOADER_DATA': str(data)}, capture_output=True, text=True)
+
+    server.shutdown()
+
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+
+    return json.loads(result.stdout)
+
+
+def print_table(rows: list[dict]) -> None:
+    print(f'{"files":>7} {"cycle":<8}{"seconds":>9}{"requests":>10}{"304":>7}{"quota":>7}{"peak MB":>9}  results')
+    for row in rows:
+        memory = '-' if row['peak_memory_mb'] is None else f'{row["peak_memory_mb"]:.1f}'
+        results = ', '.join(f'{name} {count}' for name, count in sorted(row['results'].items()))
+        print(f'{row["files"]:>7} {row["cycle"]:<8}{row["seconds"]:>9.2f}{row["requests"]:>10}{row["not_modified"]:>7}'
+              f'{row["quota_used"]:>7}{memory:>9}  {results}')
+
+
+def main() -> None:
+    if sys.argv[1:2] == ['--child']:
+        url, files, repos, changed, directory = sys.argv[2:]
+        print(json.dumps(run_cycles(url, int(files), int(repos), int(changed), Path(directory))))
+        return
+
+    parser = argparse.ArgumentParser(description='Measures update cycles against a local fake GitHub API, offline.')
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 1000, 10000], help='tracked files per scenario')
+    parser.add_argument('--repos', type=int, default=10, help='repositories the files are spread over')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every request is delayed by the server')
+    parser.add_argument('--rate-limit', type=int, default=100000, help='requests the server allows per hour')
+    parser.add_argument('--file-size', type=int, default=4096, help='size of every file in bytes')
+    parser.add_argument('--change-ratio', type=float, default=0.01, help='share of files changed before the last cycle')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--backend', choices=['rest', 'graphql'], default='rest', help='freshness backend')
+    parser.add_argument('--json', action='store_true', help='print the raw results as JSON')
+    args = parser.parse_args()
+
+    rows = [row for files in args.files for row in run_scenario(args, files)]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
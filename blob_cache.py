@@ -0,0 +1,173 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from global_variables import BLOB_CACHE_DIRECTORY_PATH
+
+# a full cache is evicted below its size, so the following saves do not evict again right away
+CACHE_LOW_WATER_MARK = 0.9
+
+
+def hash_blob(path: Path) -> str:
+    digest = hashlib.sha1(f'blob {path.stat().st_size}\0'.encode())
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class BlobCache:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.lock = threading.Lock()
+        # the last use and the size of every entry are read once per process and kept up to date by the cache
+        self.index: dict[str, tuple[float, int]] | None = None
+        self.size = 0
+
+    def path(self, sha: str) -> Path:
+        return self.directory / sha[:2] / sha
+
+    def usage_path(self, sha: str) -> Path:
+        # the last use is kept next to an entry, a hard-linked entry shares its modification time with a tracked file
+        return self.directory / sha[:2] / f'.{sha}.used'
+
+    def touch(self, sha: str) -> None:
+        try:
+            self.usage_path(sha).touch()
+        except OSError:
+            return
+
+        with self.lock:
+            if sha in self.load_index():
+                self.index[sha] = (time.time(), self.index[sha][1])
+
+    def last_use(self, path: Path) -> float:
+        try:
+            return self.usage_path(path.name).stat().st_mtime
+        except FileNotFoundError:
+            return path.stat().st_mtime
+
+    def entries(self) -> list[Path]:
+        return [path for path in self.directory.glob('??/*') if not path.name.startswith('.')]
+
+    def load_index(self) -> dict[str, tuple[float, int]]:
+        if self.index is None:
+            self.index = {}
+
+            for path in self.entries():
+                try:
+                    self.index[path.name] = (self.last_use(path), path.stat().st_size)
+                except FileNotFoundError:
+                    continue
+
+            self.size = sum(size for used, size in self.index.values())
+
+        return self.index
+
+    def copy_to(self, sha: str, target: Path, hardlink: bool = False) -> bool:
+        source = self.path(sha)
+
+        try:
+            # a tracked file which was edited in place also changes the entry it is linked to
+            if hash_blob(source) != sha:
+                self.discard(source)
+                return False
+        except FileNotFoundError:
+            return False
+
+        self.touch(sha)
+
+        descriptor, temp_path = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.tmp')
+        os.close(descriptor)
+
+        try:
+            if hardlink:
+                try:
+                    os.unlink(temp_path)
+                    os.link(source, temp_path)
+                except OSError:
+                    # links do not cross file systems, the blob is copied instead
+                    shutil.copyfile(source, temp_path)
+            else:
+                shutil.copyfile(source, temp_path)
+
+            os.replace(temp_path, target)
+        except FileNotFoundError:
+            # the entry was evicted by another thread in the meantime
+            Path(temp_path).unlink(missing_ok=True)
+            return False
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        return True
+
+    def save(self, sha: str, source: Path, max_size: int) -> None:
+        entry = self.path(sha)
+
+        if max_size <= 0 or entry.exists() or source.stat().st_size > max_size:
+            return
+
+        # indexed before the entry is written, so it is not counted twice
+        with self.lock:
+            self.load_index()
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=entry.parent, prefix='.')
+        os.close(descriptor)
+
+        try:
+            shutil.copyfile(source, temp_path)
+            # linking fails when another thread saved the same blob first, which keeps the size exact,
+            # the cache is skipped as well on file systems without links
+            os.link(temp_path, entry)
+        except OSError:
+            return
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+
+        self.touch(sha)
+
+        with self.lock:
+            self.index[sha] = (time.time(), entry.stat().st_size)
+            self.size += self.index[sha][1]
+
+        self.evict(max_size)
+
+    def discard(self, entry: Path) -> None:
+        with self.lock:
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                return
+
+            self.usage_path(entry.name).unlink(missing_ok=True)
+
+            # an entry edited in place through a link is counted with the size it was saved with
+            if self.index is not None and entry.name in self.index:
+                self.size -= self.index.pop(entry.name)[1]
+
+    def evict(self, max_size: int) -> None:
+        with self.lock:
+            self.load_index()
+
+            if self.size <= max_size:
+                return
+
+            # the least recently used entries are evicted first
+            for sha, (used, size) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                if self.size <= max_size * CACHE_LOW_WATER_MARK:
+                    break
+
+                self.path(sha).unlink(missing_ok=True)
+                self.usage_path(sha).unlink(missing_ok=True)
+                del self.index[sha]
+                self.size -= size
+
+
+blob_cache = BlobCache(BLOB_CACHE_DIRECTORY_PATH)
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import datetime
+
+from connection import request_hooks, response_hooks
+from global_variables import DEFAULT_SETTINGS
+
+# the longest a single request is held back while the remaining quota is spread over the window
+MAX_PACING_DELAY = 60
+
+
+class RateLimitBucket:
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.next_slot = 0.0
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, (self.reset or 0) - time.time())
+
+
+class RequestBudget:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # every token has a bucket of its own, they are kept by the digest of the token
+        self.buckets: dict[str, RateLimitBucket] = {}
+        # responses to a rejected token must not bring its bucket back
+        self.revoked: set[str] = set()
+        self.reserve = DEFAULT_SETTINGS['rate_limit_reserve']
+        self.pacing = DEFAULT_SETTINGS['rate_limit_pacing']
+
+    def configure(self, reserve: int, pacing: float) -> None:
+        self.reserve = reserve
+        self.pacing = pacing
+
+    def retain(self, identities: list[str]) -> None:
+        # buckets of tokens which are no longer used must not keep the work going or stop it
+        with self.lock:
+            self.buckets = {identity: self.buckets.get(identity, RateLimitBucket()) for identity in identities}
+            self.revoked = set()
+
+    def revoke(self, identity: str) -> None:
+        with self.lock:
+            self.buckets.pop(identity, None)
+            self.revoked.add(identity)
+
+    def observe(self, verb: str, url: str, status: int, headers, identity: str) -> None:
+        # the graphql and search APIs have buckets of their own
+        if headers.get('X-RateLimit-Resource', 'core') != 'core' or 'X-RateLimit-Remaining' not in headers:
+            return
+
+        with self.lock:
+            if identity in self.revoked:
+                return
+
+            bucket = self.buckets.setdefault(identity, RateLimitBucket())
+            bucket.limit = int(headers.get('X-RateLimit-Limit', bucket.limit or 0))
+            bucket.remaining = int(headers['X-RateLimit-Remaining'])
+            bucket.reset = float(headers.get('X-RateLimit-Reset', bucket.reset or 0))
+
+    def is_bucket_exhausted(self, bucket: RateLimitBucket) -> bool:
+        return bucket.remaining is not None and bucket.remaining <= self.reserve and bucket.seconds_until_reset() > 0
+
+    @property
+    def limit(self) -> int | None:
+        with self.lock:
+            limits = [bucket.limit for bucket in self.buckets.values() if bucket.limit is not None]
+
+        return sum(limits) if limits else None
+
+    @property
+    def remaining(self) -> int | None:
+        with self.lock:
+            remaining = [bucket.remaining for bucket in self.buckets.values() if bucket.remaining is not None]
+
+        return sum(remaining) if remaining else None
+
+    @property
+    def reset(self) -> float | None:
+        # the work continues as soon as the first exhausted bucket is refilled
+        with self.lock:
+            resets = [bucket.reset for bucket in self.buckets.values()
+                      if bucket.reset is not None and self.is_bucket_exhausted(bucket)] \
+                or [bucket.reset for bucket in self.buckets.values() if bucket.reset is not None]
+
+        return min(resets) if resets else None
+
+    def remaining_of(self, identity: str) -> float:
+        with self.lock:
+            bucket = self.buckets.get(identity)
+
+            # a token which was not used yet is assumed to have its whole quota
+            if bucket is None or bucket.remaining is None or bucket.seconds_until_reset() == 0:
+                return float('inf')
+
+            return bucket.remaining
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, (self.reset or 0) - time.time())
+
+    def reset_time(self) -> str:
+        return datetime.fromtimestamp(self.reset or time.time()).strftime('%H:%M:%S')
+
+    def is_exhausted(self, identity: str | None = None) -> bool:
+        with self.lock:
+            if identity is not None:
+                return identity in self.buckets and self.is_bucket_exhausted(self.buckets[identity])
+
+            # the pool hands out the other tokens until every one of them ran out
+            return bool(self.buckets) and all(self.is_bucket_exhausted(bucket) for bucket in self.buckets.values())
+
+    def pace(self, verb: str, url: str, identity: str) -> None:
+        with self.lock:
+            bucket = self.buckets.get(identity)
+
+            # the reserve is left for the work which is already running when the budget is exhausted
+            if bucket is None or bucket.remaining is None or not bucket.limit or bucket.seconds_until_reset() == 0 \
+                    or bucket.remaining > bucket.limit * self.pacing or bucket.remaining <= self.reserve:
+                return
+
+            # once the quota runs low the remaining requests are spread evenly until the reset
+            delay = min(MAX_PACING_DELAY, bucket.seconds_until_reset() / (bucket.remaining - self.reserve))
+            now = time.monotonic()
+            slot = max(now, bucket.next_slot)
+            bucket.next_slot = slot + delay
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+budget = RequestBudget()
+
+request_hooks.append(budget.pace)
+response_hooks.append(budget.observe)
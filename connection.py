@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+from urllib3.response import HTTPResponse
+from github import GithubRetry
+from github.Consts import DEFAULT_TIMEOUT
+from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, RequestsResponse
+
+# headers of a 304 response which replace the stored ones, everything else is taken from the cached response
+REFRESHED_HEADERS = ('x-ratelimit-limit', 'x-ratelimit-remaining', 'x-ratelimit-reset', 'x-ratelimit-used',
+                     'x-ratelimit-resource', 'date')
+
+# a full cache is pruned below its size, so the following saves do not scan the directory again
+CACHE_LOW_WATER_MARK = 0.9
+
+cache_directory: Path | None = None
+cache_max_size = 0
+# the last use and the size of every entry are read once per process and kept up to date by the cache functions
+cache_index: dict[str, tuple[float, int]] | None = None
+cache_size = 0
+cache_lock = threading.Lock()
+stream_session = requests.Session()
+
+# called with the verb, the url and the identity of the token before every request and additionally with the status
+# and the headers after it
+request_hooks: list[Callable[[str, str, str], None]] = []
+response_hooks: list[Callable[[str, str, int, dict[str, str], str], None]] = []
+
+
+class CachedResponse:
+    def __init__(self, status: int, headers: dict[str, str], text: str):
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+
+def token_identity(headers: dict[str, str]) -> str:
+    # the token itself is never written to disk or kept by the hooks, only a digest of it
+    return hashlib.sha256(headers.get('Authorization', '').encode()).hexdigest()
+
+
+def cache_key(url: str, headers: dict[str, str]) -> str:
+    return hashlib.sha256(f'{token_identity(headers)} {headers.get("Accept", "")} {url}'.encode()).hexdigest()
+
+
+def read_cache_entry(key: str) -> dict | None:
+    try:
+        with open(cache_directory / key[:2] / f'{key}.json', 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def touch_cache_entry(key: str) -> None:
+    # the modification time of an entry is its last use, the least recently used ones are pruned first
+    try:
+        os.utime(cache_directory / key[:2] / f'{key}.json')
+    except FileNotFoundError:
+        return
+
+    with cache_lock:
+        if key in load_cache_index():
+            cache_index[key] = (time.time(), cache_index[key][1])
+
+
+def load_cache_index() -> dict[str, tuple[float, int]]:
+    global cache_index, cache_size
+
+    if cache_index is None:
+        cache_index = {}
+
+        for path in cache_directory.glob('??/*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            cache_index[path.stem] = (stat.st_mtime, stat.st_size)
+
+        cache_size = sum(size for used, size in cache_index.values())
+
+    return cache_index
+
+
+def save_cache_entry(key: str, entry: dict) -> None:
+    global cache_size
+
+    text = json.dumps(entry)
+
+    # a response larger than the whole cache, like a big contents response, is not stored
+    if len(text.encode()) > cache_max_size:
+        return
+
+    directory = cache_directory / key[:2]
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{key}.json'
+
+    descriptor, temp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(descriptor, 'w') as file:
+        file.write(text)
+
+    with cache_lock:
+        replaced = load_cache_index().pop(key, None)
+        cache_size -= replaced[1] if replaced else 0
+
+        os.replace(temp_path, path)
+        cache_index[key] = (time.time(), path.stat().st_size)
+        cache_size += cache_index[key][1]
+
+    prune_cache()
+
+
+def prune_cache() -> None:
+    global cache_size
+
+    with cache_lock:
+        load_cache_index()
+
+        if cache_size <= cache_max_size:
+            return
+
+        for key, (used, size) in sorted(cache_index.items(), key=lambda item: item[1][0]):
+            if cache_size <= cache_max_size * CACHE_LOW_WATER_MARK:
+                break
+
+            (cache_directory / key[:2] / f'{key}.json').unlink(missing_ok=True)
+            del cache_index[key]
+            cache_size -= size
+
+
+# PyGithub keeps one connection object per Requester and stores the pending request on it between
+# request() and getresponse(), so threads sharing gv.git would read each other's requests.
+# The pending request is kept per thread instead, the underlying requests.Session is shared.
+class GithubConnectionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = threading.local()
+
+    def request(self, verb: str, url: str, input, headers: dict[str, str]) -> None:
+        self.pending.verb = verb
+        self.pending.url = url
+        self.pending.input = input
+        self.pending.headers = headers
+
+    def getresponse(self) -> RequestsResponse | CachedResponse:
+        url = f'{self.protocol}://{self.host}:{self.port}{self.pending.url}'
+        headers = dict(self.pending.headers)
+
+        if self.pending.verb != 'GET' or cache_directory is None or cache_max_size <= 0:
+            return RequestsResponse(self.send(self.pending.verb, url, headers))
+
+        # conditional requests answered with 304 Not Modified do not count against the rate limit
+        key = cache_key(url, headers)
+        entry = read_cache_entry(key)
+
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.send('GET', url, headers)
+
+        if response.status_code == 304 and entry is not None:
+            touch_cache_entry(key)
+            cached_headers = entry['headers']
+            cached_headers.update({name: value for name, value in response.headers.items()
+                                   if name.lower() in REFRESHED_HEADERS})
+
+            return CachedResponse(entry['status'], cached_headers, entry['text'])
+
+        if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            save_cache_entry(key, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'text': response.text,
+            })
+
+        return RequestsResponse(response)
+
+    def send(self, verb: str, url: str, headers: dict[str, str]) -> requests.Response:
+        identity = token_identity(headers)
+        run_request_hooks(verb, url, identity)
+        response = getattr(self.session, verb.lower())(url,
+                                                       headers=headers,
+                                                       data=self.pending.input,
+                                                       timeout=self.timeout,
+                                                       verify=self.verify,
+                                                       allow_redirects=False)
+        run_response_hooks(verb, url, response, identity)
+
+        return response
+
+
+class GithubHTTPConnection(GithubConnectionMixin, HTTPRequestsConnectionClass):
+    pass
+
+
+class GithubHTTPSConnection(GithubConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+class PrimaryRateLimitRetry(GithubRetry):
+    # GithubRetry sleeps until the reset of an exhausted primary rate limit, which blocks a worker for up to an hour.
+    # The 403 is raised instead, the response hooks already marked the token as exhausted, so its files are deferred.
+    # Secondary rate limits and server errors are still retried with backoff.
+    def increment(self, method: str | None = None, url: str | None = None, response: HTTPResponse | None = None,
+                  error: Exception | None = None, _pool=None, _stacktrace=None) -> Retry:
+        if response is not None and response.status == 403 and 'Retry-After' not in response.headers \
+                and response.headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                output = json.loads(self.get_content(response, url))
+            except (ValueError, TypeError):
+                output = {'message': response.reason}
+
+            raise Requester.createException(response.status, response.headers, output)
+
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def run_request_hooks(verb: str, url: str, identity: str) -> None:
+    for hook in request_hooks:
+        hook(verb, url, identity)
+
+
+def run_response_hooks(verb: str, url: str, response: requests.Response, identity: str) -> None:
+    for hook in response_hooks:
+        hook(verb, url, response.status_code, response.headers, identity)
+
+
+def open_stream(url: str, headers: dict[str, str], params: dict[str, str] | None = None) -> requests.Response:
+    identity = token_identity(headers)
+    run_request_hooks('GET', url, identity)
+    response = stream_session.get(url, headers=headers, params=params, stream=True, timeout=DEFAULT_TIMEOUT)
+    run_response_hooks('GET', url, response, identity)
+
+    return response
+
+
+def configure_stream_session(pool_size: int, retry: Retry) -> None:
+    # downloads share keep-alive connections the same way the API requests of gv.git do
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    stream_session.mount('http://', adapter)
+    stream_session.mount('https://', adapter)
+
+
+def configure_http_cache(max_size: int) -> None:
+    global cache_max_size
+    cache_max_size = max_size
+
+    if cache_directory is not None and cache_directory.exists():
+        prune_cache()
+
+
+def install_connection_classes(http_cache_directory: Path | None = None, http_cache_size: int = 0) -> None:
+    global cache_directory, cache_max_size, cache_index
+    cache_directory = http_cache_directory
+    cache_max_size = http_cache_size
+    cache_index = None
+
+    # Requester.injectConnectionClasses() also disables connection reuse, so the classes are set directly.
+    Requester._Requester__httpConnectionClass = GithubHTTPConnection
+    Requester._Requester__httpsConnectionClass = GithubHTTPSConnection
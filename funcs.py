@@ -1,18 +1,45 @@
-import base64
+import atexit
+import json
 import os
 import re
+import tempfile
 import textwrap
-from datetime import datetime, timezone
+import threading
 from pathlib import Path
-from tkinter import Misc
 from types import NoneType
+from urllib.parse import quote
 
-from CTkMessagebox import CTkMessagebox
-from customtkinter import CTkFrame, CTk
+import requests
 from github import Github, BadCredentialsException, UnknownObjectException, GithubException
+from github.Auth import Token
+from github.Consts import DEFAULT_USER_AGENT, DEFAULT_BASE_URL
+from github.Requester import Requester
+from requests.exceptions import RequestException
+from urllib3 import Retry
 
 import global_variables as gv
-from global_variables import FILES_FILE_PATH, AUTH_FILE_PATH, DOWNLOADED_DIRECTORY_PATH, GeneralException
+import metadata
+import store
+from blob_cache import blob_cache, hash_blob
+from connection import open_stream, configure_stream_session, configure_http_cache, PrimaryRateLimitRetry
+from metrics import metrics
+from global_variables import AUTH_FILE_PATH, DOWNLOADED_DIRECTORY_PATH, SETTINGS_FILE_PATH, \
+    BLOB_HASHES_FILE_PATH, DEFAULT_SETTINGS
+from store import str_to_link
+from tokens import token_pool
+
+CHUNK_SIZE = 64 * 1024
+# interrupted downloads smaller than this start from zero again, resuming them is not worth a state file
+RESUME_MIN_SIZE = 1024 * 1024
+# transient server errors of raw downloads, the API retries every 5xx and secondary rate limits
+RETRIED_STATUSES = [500, 502, 503, 504]
+
+settings_cache: tuple[int | None, dict] = (-1, {})
+blob_hashes: dict[str, dict] | None = None
+blob_hashes_lock = threading.Lock()
+blob_hashes_changed = False
+written_files: set[Path] = set()
+written_files_lock = threading.Lock()
 
 
 def return_manual() -> str:
@@ -23,6 +50,11 @@ def return_manual() -> str:
     Q: What format of link should i consider when I add a new file?
     A: This is how link should look like: https://github.com/revel111/GithubDownloader/blob/master/main.py
 
+    Q: How to track a whole directory?
+    A: Add a link to the directory or a glob pattern in it: https://github.com/revel111/GithubDownloader/tree/master/configs
+    or https://github.com/revel111/GithubDownloader/tree/master/configs/**/*.yaml
+    Files which are added upstream are downloaded and files which are deleted upstream are deleted locally.
+
     Q: Where can I report about bugs and send any idea regarding this project?
     A: Link: https://github.com/revel111/GithubDownloader/issues 
     I ask you to report any kind of bugs. Each bug will be fixed and any idea will be reviewed.
@@ -44,6 +76,22 @@ def parse_link(link: str) -> tuple[str, str, str, str]:
         raise ValueError
 
 
+def parse_tree_link(link: str) -> tuple[str, str, str, str]:
+    # the pattern is a directory or a glob such as "configs/**/*.yaml", an empty one stands for the whole branch
+    pattern = r"https://github\.com/(?P<owner_name>[^/]+)/(?P<repo_name>[^/]+)/tree/(?P<branch>[^/]+)(?:/(?P<pattern>.*))?"
+    match = re.fullmatch(pattern, link.strip())
+
+    if match:
+        return (
+            match.group('owner_name'),
+            match.group('repo_name'),
+            match.group('branch'),
+            (match.group('pattern') or '').strip('/')
+        )
+    else:
+        raise ValueError
+
+
 def validate_path(path: Path) -> Path:
     if not path.exists() or not path.is_dir() or str(path) == '.' or str(path) == '..':
         path = DOWNLOADED_DIRECTORY_PATH
@@ -51,128 +99,394 @@ def validate_path(path: Path) -> Path:
     return path
 
 
-def read_credentials() -> str:
+def read_credentials() -> list[tuple[str, list[str]]]:
+    # one token per line, optionally followed by the owners whose repositories are only read with this token
     with open(AUTH_FILE_PATH, 'r') as file:
-        return file.read()
+        return [(parts[0], parts[1:]) for parts in (line.split() for line in file)
+                if parts and not parts[0].startswith('#')]
 
 
-def read_tracked_files() -> list[list[str]]:
-    with open(FILES_FILE_PATH, 'r') as file:
-        return [line.split() for line in file]
+def save_credentials(credentials: list[tuple[str, list[str]]]) -> None:
+    gv.FILES_DIRECTORY_PATH.mkdir(exist_ok=True)
+    with open(AUTH_FILE_PATH, 'w') as file:
+        file.writelines(' '.join([token, *owners]) + '\n' for token, owners in credentials)
 
 
-def fabricate_links() -> list[list[str]]:
-    return [[str_to_link(line[0], line[1], line[2], line[3]), line[4]] for line in
-            read_tracked_files()]
+def create_client(token: str | None, base_url: str = DEFAULT_BASE_URL) -> Github:
+    workers = read_setting('workers')
+    backoff = read_setting('retry_backoff')
+    # the graphql endpoint is the only POST and it only reads
+    methods = Retry.DEFAULT_ALLOWED_METHODS | {'POST'}
+
+    # raw downloads skip the API retry, it reads the body of a 403 which a streamed response has not loaded
+    configure_stream_session(workers, Retry(total=read_setting('retry_attempts'), backoff_factor=backoff,
+                                            backoff_jitter=backoff, status_forcelist=RETRIED_STATUSES,
+                                            respect_retry_after_header=True))
+
+    configure_http_cache(read_setting('http_cache_size'))
+    metadata.clear()
+
+    # every thread shares this client, so it neither throttles requests nor holds fewer connections than workers
+    return Github(auth=Token(token) if token else None,
+                  base_url=base_url,
+                  retry=PrimaryRateLimitRetry(total=read_setting('retry_attempts'), backoff_factor=backoff,
+                                              backoff_jitter=backoff, allowed_methods=methods),
+                  pool_size=workers,
+                  seconds_between_requests=None,
+                  seconds_between_writes=None)
 
 
-def str_to_link(owner_name: str, repo_name: str, branch: str, path: str) -> str:
-    return f'https://github.com/{owner_name}/{repo_name}/blob/{branch}/{path}'
+def create_clients(credentials: list[tuple[str, list[str]]], base_url: str = DEFAULT_BASE_URL) -> Github:
+    clients = [(token, create_client(token, base_url), owners) for token, owners in credentials] \
+        or [(None, create_client(None, base_url), [])]
+    token_pool.configure(clients)
 
+    # the first token is the one the application logs in with
+    return clients[0][1]
 
-def check_download(owner_name: str, repo_name: str, branch: str, path: str, location: str) -> bool:
+
+def read_setting(name: str):
+    global settings_cache
+
+    try:
+        modified = SETTINGS_FILE_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        modified = None
+
+    # the file is parsed again only after it was changed
+    if settings_cache[0] != modified:
+        try:
+            with open(SETTINGS_FILE_PATH, 'r') as file:
+                settings_cache = (modified, json.load(file))
+        except (FileNotFoundError, json.JSONDecodeError):
+            settings_cache = (modified, {})
+
+    return settings_cache[1].get(name, DEFAULT_SETTINGS[name])
+
+
+def read_tracked_files() -> list[list]:
+    return store.read_tracked_files()
+
+
+def fabricate_links(files: list[list] | None = None) -> list[list[str]]:
+    return [[str_to_link(line[0], line[1], line[2], line[3]), line[4]] for line in
+            (read_tracked_files() if files is None else files)]
+
+
+def resolve_target(location: str | Path, path: str) -> Path:
     location = Path(location)
+    name = path.split('/')[-1]
 
-    if not location.exists():
-        return True
+    if location.exists() and location.is_dir():
+        return location / name
+
+    return DOWNLOADED_DIRECTORY_PATH / name
 
+
+def read_blob_hashes() -> dict[str, dict]:
     try:
-        repo = gv.git.get_repo(f"{owner_name}/{repo_name}")
-        commits = repo.get_commits(path=path, sha=branch)
+        with open(BLOB_HASHES_FILE_PATH, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
 
-        latest_commit = commits[0]
 
-        commit_date = latest_commit.commit.author.date
-    except (UnknownObjectException, GithubException):
-        return False
-    except ConnectionError:
-        return False
+def save_blob_hashes() -> None:
+    global blob_hashes_changed
+
+    # new hashes are written once per update cycle and at exit instead of rewriting the whole file for each of them
+    with blob_hashes_lock:
+        if not blob_hashes_changed:
+            return
+
+        BLOB_HASHES_FILE_PATH.parent.mkdir(exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=BLOB_HASHES_FILE_PATH.parent)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(blob_hashes, file)
+        os.replace(temp_path, BLOB_HASHES_FILE_PATH)
+        blob_hashes_changed = False
+
+
+atexit.register(save_blob_hashes)
+
+
+def remember_blob_sha(path: Path, sha: str) -> None:
+    global blob_hashes, blob_hashes_changed
+
+    stat = path.stat()
+
+    with blob_hashes_lock:
+        if blob_hashes is None:
+            blob_hashes = read_blob_hashes()
+
+        blob_hashes[str(path.resolve())] = {'inode': stat.st_ino, 'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+                                            'sha': sha}
+        blob_hashes_changed = True
+
+
+def git_blob_sha(path: Path) -> str:
+    global blob_hashes
+
+    stat = path.stat()
+
+    with blob_hashes_lock:
+        if blob_hashes is None:
+            blob_hashes = read_blob_hashes()
+
+        cached = blob_hashes.get(str(path.resolve()))
+
+    # hashing is skipped while the file keeps the inode, size and modification time it was hashed with
+    if cached and (cached['inode'], cached['size'], cached['mtime']) == (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+        return cached['sha']
+
+    sha = hash_blob(path)
+    remember_blob_sha(path, sha)
 
-    modification_time = os.path.getmtime(location)
-    modification_date = datetime.fromtimestamp(modification_time, tz=timezone.utc)
+    return sha
 
-    return commit_date > modification_date
+
+def is_unchanged(target: Path, sha: str) -> bool:
+    return target.exists() and git_blob_sha(target) == sha
+
+
+def record_write(target: Path) -> None:
+    if read_setting('fsync_writes'):
+        with written_files_lock:
+            written_files.add(target)
+
+
+def sync_written_files() -> None:
+    # written files and their directories are flushed to disk once per cycle instead of after every file
+    with written_files_lock:
+        files = list(written_files)
+        written_files.clear()
+
+    for path in {*files, *(file.parent for file in files)}:
+        try:
+            descriptor = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            # directories cannot be synced on every platform
+            pass
+        finally:
+            os.close(descriptor)
+
+
+atexit.register(sync_written_files)
+
+
+def get_remote_blob_sha(owner_name: str, repo_name: str, branch: str, path: str) -> str:
+    return token_pool.get_repo(owner_name, repo_name).get_contents(path, ref=branch).sha
+
+
+def check_download(owner_name: str, repo_name: str, branch: str, path: str, location: str,
+                   remote_sha: str | None = None) -> bool:
+    target = resolve_target(location, path)
+
+    if not target.exists():
+        return True
+
+    # a check which failed is not an up to date file, otherwise the file would be remembered as synced
+    if remote_sha is None:
+        try:
+            remote_sha = get_remote_blob_sha(owner_name, repo_name, branch, path)
+        except UnknownObjectException:
+            raise gv.ErrorException(f'File "{path}" does not exist on the branch "{branch}" anymore.')
+        except GithubException as e:
+            raise gv.WarningException(f'File "{path}" could not be checked, Github answered with {e.status}.')
+        except (RequestException, ConnectionError):
+            raise gv.WarningException(
+                'No connection with Github. Please check your network connection or try again later.')
+
+    return git_blob_sha(target) != remote_sha
 
 
 def delete_all_tracked_files() -> None:
-    if FILES_FILE_PATH.exists():
-        Path.unlink(FILES_FILE_PATH)
+    if store.delete_all_tracked_files():
         raise gv.SuccessException('All tracked files were deleted.')
 
     raise gv.WarningException('No files were being tracked.')
 
 
-def download_file(owner_name: str, repo_name: str, branch: str, path: str, location: str) -> None:
-    location = Path(location)
+def get_requester(owner_name: str, repo_name: str, client: Github | None = None) -> Requester:
+    # a lazy repository does not make a request, its requester holds the token and the base url of the client,
+    # which is the one the pool serves the owner with unless a client is given
+    client = token_pool.client_for(owner_name) if client is None else client
 
-    try:
-        repo = gv.git.get_repo(f"{owner_name}/{repo_name}")
-        content_encoded = repo.get_contents(path, ref=branch).content
-    except (UnknownObjectException, GithubException):
+    return client.get_repo(f'{owner_name}/{repo_name}', lazy=True)._requester
+
+
+def open_raw_stream(owner_name: str, repo_name: str, branch: str, path: str,
+                    extra_headers: dict[str, str] | None = None) -> requests.Response:
+    requester = get_requester(owner_name, repo_name)
+    headers = {'Accept': 'application/vnd.github.raw', 'User-Agent': DEFAULT_USER_AGENT, **(extra_headers or {})}
+
+    if requester.auth is not None:
+        headers['Authorization'] = f'{requester.auth.token_type} {requester.auth.token}'
+
+    response = open_stream(f'{requester.base_url}/repos/{owner_name}/{repo_name}/contents/{quote(path)}',
+                           headers, {'ref': branch})
+
+    if response.status_code not in (200, 206):
+        response.close()
         raise gv.ErrorException('Invalid data was passed.')
-    except ConnectionError:
-        raise gv.WarningException('No connection with Github. Please check your network connection or try again later.')
 
-    content = base64.b64decode(content_encoded).decode('utf-8')
-    name = path.split('/')[-1]
+    return response
 
-    DOWNLOADED_DIRECTORY_PATH.mkdir(exist_ok=True)
 
-    if location.exists() and location.is_dir():
-        try:
-            with open(location / name, 'w') as file:
-                file.write(content)
-        except Exception:
-            raise gv.ErrorException('Unsupported type of file was tried to be downloaded.')
+def part_paths(target: Path) -> tuple[Path, Path]:
+    return target.with_name(f'.{target.name}.part'), target.with_name(f'.{target.name}.part.json')
 
-        raise gv.SuccessException(f'File "{path}" was downloaded into "{location}".')
-    else:
-        with open(DOWNLOADED_DIRECTORY_PATH / name, 'w') as file:
-            file.write(content)
-        raise gv.InfoException(
-            f'Location "{location}" does not exist, file was was downloaded into "{DOWNLOADED_DIRECTORY_PATH}".')
 
+def remove_part(target: Path) -> None:
+    for part_path in part_paths(target):
+        part_path.unlink(missing_ok=True)
+
+
+def read_part_state(target: Path, link: str, blob_sha: str | None) -> dict | None:
+    part, state_path = part_paths(target)
 
-def search_location_by_link(link: str, name: str) -> str:
     try:
-        with open(FILES_FILE_PATH, 'r') as file:
-            lines = file.readlines()
+        with open(state_path, 'r') as file:
+            state = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # a part of another file or of another version than the expected one cannot be continued
+    if state.get('link') != link or blob_sha is not None and state.get('blob_sha') not in (None, blob_sha) \
+            or not part.exists():
+        return None
+
+    return state
+
+
+def fetch_file(owner_name: str, repo_name: str, branch: str, path: str, target: Path, blob_sha: str | None = None,
+               resume: bool = True) -> tuple[str, bool]:
+    link = str_to_link(owner_name, repo_name, branch, path)
+    part, state_path = part_paths(target)
+    state = read_part_state(target, link, blob_sha) if resume else None
+    offset = part.stat().st_size if state is not None else 0
 
-            if len(lines) == 0:
-                raise FileNotFoundError
+    if state is None:
+        remove_part(target)
 
-            for line in lines:
-                split = line.strip('\n').split(' ')
+    # If-Range makes the server send the whole file again when the version behind the ETag changed
+    try:
+        response = open_raw_stream(owner_name, repo_name, branch, path,
+                                   {'Range': f'bytes={offset}-', 'If-Range': state['etag']} if offset else None)
+    except gv.ErrorException:
+        if not offset:
+            raise
+
+        # a range which cannot be served, for example of a part which was already complete, starts over
+        remove_part(target)
+        return fetch_file(owner_name, repo_name, branch, path, target, blob_sha, resume=False)
 
-                if ''.join(split[:-1]) == link:
-                    return split[-1]
+    try:
+        if response.status_code != 206:
+            offset = 0
+            etag = response.headers.get('ETag', '')
+
+            # only a strong ETag may be used for a range, without one an interrupted download starts over
+            if etag and not etag.startswith('W/'):
+                with open(state_path, 'w') as file:
+                    json.dump({'link': link, 'blob_sha': blob_sha, 'etag': etag}, file)
             else:
-                raise gv.ErrorException(f'File "{name}" does not exist.')
-    except FileNotFoundError:
-        raise gv.WarningException('No files are currently being tracked.')
+                state_path.unlink(missing_ok=True)
+
+        with open(part, 'ab' if offset else 'wb') as file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+                metrics.add_downloaded_bytes(len(chunk))
+    except RequestException:
+        # what arrived is kept for the next attempt unless it is too small to be worth resuming
+        if not state_path.exists() or not part.exists() or part.stat().st_size < RESUME_MIN_SIZE:
+            remove_part(target)
+        raise
+    except BaseException:
+        remove_part(target)
+        raise
+    finally:
+        response.close()
+
+    sha = hash_blob(part)
+
+    # the content is checked before it replaces the target, a resumed part which does not match is fetched whole
+    if blob_sha is not None and sha != blob_sha:
+        remove_part(target)
+
+        if offset:
+            return fetch_file(owner_name, repo_name, branch, path, target, blob_sha, resume=False)
+
+        raise gv.WarningException(f'File "{path}" changed while it was downloaded, it will be downloaded again.')
 
+    # identical content leaves the target and its modification time alone
+    if is_unchanged(target, sha):
+        remove_part(target)
+        return sha, False
+
+    os.replace(part, target)
+    state_path.unlink(missing_ok=True)
+    remember_blob_sha(target, sha)
+
+    return sha, True
+
+
+def download_file(owner_name: str, repo_name: str, branch: str, path: str, location: str,
+                  blob_sha: str | None = None) -> None:
+    location = Path(location)
+    target = resolve_target(location, path)
+    cache_size = read_setting('blob_cache_size')
+
+    DOWNLOADED_DIRECTORY_PATH.mkdir(exist_ok=True)
 
-def delete_tracked_file(line_to_delete: str, name: str) -> tuple[str, int]:
     try:
-        with open(FILES_FILE_PATH, 'r+') as file:
-            found = -1
-            lines = file.readlines()
-            file.seek(0)
+        # a target which already holds the blob is not touched, a blob which was seen before is taken from the
+        # local cache without a request
+        if blob_sha is not None and is_unchanged(target, blob_sha):
+            written = False
+        elif cache_size > 0 and blob_sha is not None \
+                and blob_cache.copy_to(blob_sha, target, read_setting('blob_cache_hardlinks')):
+            written = True
+        else:
+            sha, written = fetch_file(owner_name, repo_name, branch, path, target, blob_sha)
+
+            if cache_size > 0:
+                blob_cache.save(sha, target, cache_size)
+    except RequestException:
+        raise gv.WarningException('No connection with Github. Please check your network connection or try again later.')
+    except OSError:
+        raise gv.ErrorException(f'File "{path}" could not be written into "{target.parent}".')
+
+    if not written:
+        raise gv.UnchangedException(f'File "{path}" already has the same content in "{target.parent}".')
 
-            if len(lines) == 0:
-                raise FileNotFoundError
+    record_write(target)
 
-            for i, line in enumerate(lines):
-                if ''.join(line.strip('\n').split(' ')[:-1]) != line_to_delete:
-                    file.write(line)
-                else:
-                    found = i
+    if location.exists() and location.is_dir():
+        raise gv.SuccessException(f'File "{path}" was downloaded into "{location}".')
+    else:
+        raise gv.InfoException(
+            f'Location "{location}" does not exist, file was was downloaded into "{DOWNLOADED_DIRECTORY_PATH}".')
 
-            file.truncate()
 
-            return (f'File "{name}" does not exist.', found) if found == -1 else (f'File "{name}" was deleted.', found)
-    except FileNotFoundError:
-        raise gv.WarningException('No files are currently being tracked.')
+def search_location_by_link(link: str, name: str) -> str:
+    files = store.find_tracked_files_by_link(link)
+
+    if not files:
+        raise gv.ErrorException(f'File "{name}" does not exist.')
+
+    return files[0][4]
+
+
+def delete_tracked_file(link: str, name: str) -> tuple[str, int]:
+    found = store.delete_tracked_files_by_link(link)
+
+    return (f'File "{name}" does not exist.', found) if found == -1 else (f'File "{name}" was deleted.', found)
 
 
 def authenticate_token(token: str) -> None:
@@ -180,66 +494,62 @@ def authenticate_token(token: str) -> None:
         raise gv.ErrorException('You entered invalid secure token. Try again.\n')
 
     try:
-        gv.git = Github(token)
-        gv.git.get_user().login
+        pool = read_credentials()[1:]
+    except FileNotFoundError:
+        pool = []
+
+    # the entered token replaces the one the application logs in with, the rest of the pool is kept
+    credentials = [(token, []), *[entry for entry in pool if entry[0] != token]]
+
+    try:
+        gv.git = create_clients(credentials)
+        metadata.get_login()
     except BadCredentialsException:
         raise gv.ErrorException('You entered invalid secure token. Try again.\n')
     except ConnectionError:
         raise gv.WarningException('No connection with Github. Please check your network connection or try again later.')
 
-    gv.FILES_DIRECTORY_PATH.mkdir(exist_ok=True)
-    with open(AUTH_FILE_PATH, 'w') as file:
-        file.write(token)
+    save_credentials(credentials)
 
 
-def validate_data(owner_name: str, repo_name: str, branch: str, path: str) -> None:
+def validate_data(owner_name: str, repo_name: str, branch: str, path: str | None) -> str | None:
     try:
         try:
-            gv.git.get_user(owner_name)
+            repo = metadata.get_repository(owner_name, repo_name)
         except UnknownObjectException:
-            raise gv.ErrorException(f'The user "{owner_name}" does not exist.')
+            # the owner is only looked up to tell which part of the link is wrong
+            try:
+                token_pool.client_for(owner_name).get_user(owner_name)
+            except UnknownObjectException:
+                raise gv.ErrorException(f'The user "{owner_name}" does not exist.')
 
-        try:
-            repo = gv.git.get_repo(f"{owner_name}/{repo_name}")
-        except UnknownObjectException:
             raise gv.ErrorException(f'The repository "{repo_name}" does not exist.')
 
-        try:
-            repo.get_branch(branch)
-        except GithubException:
-            raise gv.ErrorException(f'The branch "{branch}" does not exist in the repository "{repo_name}".')
+        # tracked trees are validated up to the branch, their members are only known after the expansion
+        if path is None:
+            if not metadata.branch_exists(owner_name, repo_name, branch):
+                raise gv.ErrorException(f'The branch "{branch}" does not exist in the repository "{repo_name}".')
+            return None
 
         try:
-            repo.get_contents(path, ref=branch)
+            contents = repo.get_contents(path, ref=branch)
         except UnknownObjectException:
+            if not metadata.branch_exists(owner_name, repo_name, branch):
+                raise gv.ErrorException(f'The branch "{branch}" does not exist in the repository "{repo_name}".')
+
             raise gv.ErrorException(f'The file "{path}" does not exist in the branch "{branch}".')
+
+        if isinstance(contents, list):
+            raise gv.ErrorException(f'"{path}" is a directory, it can be tracked with a link to the directory.')
+
+        return contents.sha
     except ConnectionError:
         raise gv.WarningException('No connection with Github. Please check your network connection or try again later.')
 
 
 def save_tracked_file(owner_name: str, repo_name: str, branch: str, path: str, location: Path) -> None:
-    gv.FILES_DIRECTORY_PATH.mkdir(exist_ok=True)
+    store.save_tracked_files([(owner_name, repo_name, branch, path, location)])
+
 
-    with open(FILES_FILE_PATH, 'a') as file:
-        file.write(f'{owner_name} {repo_name} {branch} {path} {location}\n')
-
-
-def define_exception(exception: GeneralException, master: CTkFrame | CTk | Misc) -> CTkMessagebox:
-    icon = str
-    title = str
-
-    match exception:
-        case gv.SuccessException():
-            icon = 'check'
-            title = 'Success'
-        case gv.ErrorException():
-            icon = 'cancel'
-            title = 'Error'
-        case gv.WarningException():
-            icon = 'warning'
-            title = 'Warning'
-        case gv.InfoException():
-            icon = 'info'
-            title = 'Info'
-
-    return CTkMessagebox(master=master, icon=icon, title=title, message=str(exception))
+def set_tracked_file_priority(file_id: int, priority: int) -> None:
+    store.update_tracked_files([{'id': file_id, 'priority': priority}])
@@ -1,14 +1,47 @@
+import os
 from pathlib import Path
 
 from github import Github
 
+from connection import install_connection_classes
+
 CURRENT_FILE_PATH = Path(__file__).parent.resolve()
-FILES_DIRECTORY_PATH = CURRENT_FILE_PATH / 'data'
+# the benchmarks point this to a temporary directory, so they never touch the real tracked files
+FILES_DIRECTORY_PATH = Path(os.environ.get('GITHUB_DOWNLOADER_DATA', CURRENT_FILE_PATH / 'data'))
 AUTH_FILE_PATH = FILES_DIRECTORY_PATH / 'credentials.env'
 FILES_FILE_PATH = FILES_DIRECTORY_PATH / 'files.txt'
+DATABASE_FILE_PATH = FILES_DIRECTORY_PATH / 'files.db'
 DOWNLOADED_DIRECTORY_PATH = CURRENT_FILE_PATH / 'downloaded'
 LOG_PATH = CURRENT_FILE_PATH / 'log.txt'
+SETTINGS_FILE_PATH = FILES_DIRECTORY_PATH / 'settings.json'
+HTTP_CACHE_DIRECTORY_PATH = FILES_DIRECTORY_PATH / 'http_cache'
+BLOB_HASHES_FILE_PATH = FILES_DIRECTORY_PATH / 'blob_hashes.json'
+BLOB_CACHE_DIRECTORY_PATH = FILES_DIRECTORY_PATH / 'blobs'
+
+DEFAULT_SETTINGS = {
+    'workers': 8,
+    'rate_limit_reserve': 50,
+    'rate_limit_pacing': 0.2,
+    'poll_interval_min': 300,
+    'poll_interval_max': 86400,
+    'poll_jitter': 0.1,
+    'freshness_backend': 'rest',
+    'graphql_batch_cost': 200,
+    'webhook_host': '127.0.0.1',
+    'webhook_port': 0,
+    'webhook_secret': '',
+    'blob_cache_size': 256 * 1024 * 1024,
+    'blob_cache_hardlinks': False,
+    'retry_attempts': 5,
+    'retry_backoff': 0.5,
+    'metrics_host': '127.0.0.1',
+    'metrics_port': 0,
+    'archive_threshold': 20,
+    'fsync_writes': False,
+    'http_cache_size': 64 * 1024 * 1024,
+}
 
+install_connection_classes(HTTP_CACHE_DIRECTORY_PATH, DEFAULT_SETTINGS['http_cache_size'])
 git = Github()
 
 
@@ -30,3 +63,15 @@ class WarningException(GeneralException):
 
 class InfoException(GeneralException):
     pass
+
+
+class UpToDateException(InfoException):
+    pass
+
+
+class UnchangedException(UpToDateException):
+    pass
+
+
+class DeferredException(WarningException):
+    pass
@@ -0,0 +1,103 @@
+import json
+
+from github import Github, GithubException
+
+from funcs import get_requester, read_setting
+from global_variables import GeneralException
+from tokens import token_pool
+
+
+def quote(value: str) -> str:
+    # a JSON string is a valid GraphQL string literal
+    return json.dumps(value)
+
+
+def query_cost(paths: list[str]) -> int:
+    # the repository, the branch reference and one object per tracked path
+    return 2 + len(paths)
+
+
+def split_batches(groups: dict[tuple[str, str, str], list[str]], max_cost: int) \
+        -> list[list[tuple[tuple[str, str, str], list[str]]]]:
+    batches = [[]]
+    cost = 0
+    # a branch with more paths than fit into one query is split over several of them
+    part_length = max(1, max_cost - query_cost([]))
+
+    for key, paths in groups.items():
+        for start in range(0, len(paths), part_length):
+            part = paths[start:start + part_length]
+
+            if cost + query_cost(part) > max_cost and batches[-1]:
+                batches.append([])
+                cost = 0
+
+            batches[-1].append((key, part))
+            cost += query_cost(part)
+
+    return [batch for batch in batches if batch]
+
+
+def build_query(batch: list[tuple[tuple[str, str, str], list[str]]]) -> str:
+    repositories = []
+
+    for index, ((owner_name, repo_name, branch), paths) in enumerate(batch):
+        objects = ' '.join(f'f{number}: object(expression: {quote(f"{branch}:{path}")}) {{ oid }}'
+                           for number, path in enumerate(paths))
+        repositories.append(f'r{index}: repository(owner: {quote(owner_name)}, name: {quote(repo_name)}) {{ '
+                            f'head: ref(qualifiedName: {quote(f"refs/heads/{branch}")}) {{ target {{ oid }} }} '
+                            f'{objects} }}')
+
+    return 'query { ' + ' '.join(repositories) + ' }'
+
+
+def split_by_client(groups: dict[tuple[str, str, str], list[str]]) \
+        -> list[tuple[Github, dict[tuple[str, str, str], list[str]]]]:
+    # a query is sent with a single token, repositories of owners pinned to another token would come back null
+    clients = {}
+
+    for key, paths in groups.items():
+        try:
+            client = token_pool.client_for(key[0])
+        except GeneralException:
+            continue
+
+        clients.setdefault(id(client), (client, {}))[1][key] = paths
+
+    return list(clients.values())
+
+
+def run_query(client: Github, batch: list[tuple[tuple[str, str, str], list[str]]]) -> dict:
+    owner_name, repo_name, _ = batch[0][0]
+    # the batch is sent with the token it was split for
+    requester = get_requester(owner_name, repo_name, client)
+
+    # errors of single repositories come back next to the data, which is null for them
+    headers, data = requester.requestJsonAndCheck('POST', requester.graphql_url, input={'query': build_query(batch)})
+
+    return data.get('data') or {}
+
+
+def read_freshness(groups: dict[tuple[str, str, str], list[str]]) \
+        -> tuple[dict[tuple[str, str, str], str | None], dict[tuple[str, str, str], dict[str, str]]]:
+    heads = {key: None for key in groups}
+    remote_shas = {}
+
+    for client, client_groups in split_by_client(groups):
+        for batch in split_batches(client_groups, read_setting('graphql_batch_cost')):
+            try:
+                data = run_query(client, batch)
+            except (GithubException, OSError):
+                continue
+
+            for index, (key, paths) in enumerate(batch):
+                repository = data.get(f'r{index}') or {}
+                head = (repository.get('head') or {}).get('target') or {}
+                heads[key] = head.get('oid')
+
+                shas = remote_shas.setdefault(key, {})
+                for number, path in enumerate(paths):
+                    if repository.get(f'f{number}'):
+                        shas[path] = repository[f'f{number}']['oid']
+
+    return heads, remote_shas
@@ -1,5 +1,7 @@
 from pathlib import Path
+from tkinter import Misc
 from types import NoneType
+from typing import Callable, Iterator
 
 import customtkinter
 from CTkMenuBar import CTkMenuBar
@@ -7,14 +9,23 @@ from CTkMessagebox import CTkMessagebox
 from CTkTable import CTkTable
 from PIL import Image
 from customtkinter import CTk, CTkButton, CTkToplevel, CTkFrame, CTkLabel, CTkEntry, CTkInputDialog, CTkOptionMenu, \
-    CTkScrollableFrame, CTkTextbox, CTkImage
-from github import Github, BadCredentialsException
+    CTkTextbox, CTkImage, CTkProgressBar
+from github import BadCredentialsException
 
 import global_variables as gv
-from funcs import validate_data, define_exception, save_tracked_file, download_file, delete_tracked_file, \
-    search_location_by_link, authenticate_token, read_credentials, fabricate_links, str_to_link
+import store
+from funcs import validate_data, save_tracked_file, download_file, delete_tracked_file, authenticate_token, \
+    read_credentials, str_to_link, create_clients, return_manual, parse_link, validate_path, read_setting
 from global_variables import GeneralException, DOWNLOADED_DIRECTORY_PATH
-from main import return_manual, parse_link, validate_path
+from metadata import get_login
+from tasks import TaskQueue, QUEUED, DONE, CANCELLED
+from updater import update_tracked_file, update_tracked_files
+
+# milliseconds between two looks at the finished background work
+POLL_INTERVAL = 100
+# rows of tracked files shown at once and milliseconds the search waits for the next key
+PAGE_SIZE = 20
+SEARCH_DELAY = 200
 
 
 class ManualWindow(CTkToplevel):
@@ -62,15 +73,22 @@ class AppearanceFrame(CTkFrame):
         customtkinter.set_widget_scaling(new_scaling_float)
 
 
-class TableFrame(CTkScrollableFrame):
-    def __init__(self, master, **kwargs):
+class TableFrame(CTkFrame):
+    def __init__(self, master, tasks: TaskQueue, **kwargs):
         super().__init__(master, **kwargs)
 
-        self.row_buttons = {}
+        self.tasks = tasks
+        # every tracked file is kept by its id as [link, location, status, file], only one page of them has widgets
+        self.entries = {}
+        self.visible = []
+        self.page_ids = []
+        self.slots = {}
+        self.page = 0
+        self.query = ''
+        self.search_job = None
 
-        self.grid_columnconfigure(0, weight=0)
-        self.grid_columnconfigure(1, weight=0)
-        self.grid_columnconfigure(2, weight=0)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
 
         self.delete_button_image = CTkImage(
             dark_image=Image.open('resources/delete_white.png'),
@@ -81,77 +99,141 @@ class TableFrame(CTkScrollableFrame):
             light_image=Image.open('resources/update_black.png'),
             size=(15, 15))
 
-        try:
-            links = fabricate_links()
-            self.table = CTkTable(master=self, row=len(links), column=2, values=links)
-            # self.table.delete_row(1)
-            self.initialize_buttons(links)
-        except (FileNotFoundError, IndexError):
-            self.table = CTkTable(master=self, row=0, column=2, values=[[]])
-            self.table.delete_row(1)
-        self.table.add_row(['Link', 'Stored'], 0)
-
-        self.table.grid(row=0, column=0, padx=10, pady=0, sticky='nsew')
-
-    def initialize_buttons(self, links: list[list[str]]) -> None:
-        for i, link in enumerate(links, start=1):
-            owner_name, repo_name, branch, path = parse_link(link[0])
-            self.add_buttons(i, owner_name, repo_name, branch, path, link[1])
-
-    def change_indexes(self, index: int) -> None:
-        temp = dict()
-        for key, val in self.row_buttons.items():
-            if key >= index:
-                temp[key - 1] = 0
+        self.search_entry = CTkEntry(master=self, placeholder_text='Search by link or location')
+        self.search_entry.bind('<KeyRelease>', self.schedule_search)
+        self.search_entry.grid(row=0, column=0, padx=10, pady=5, sticky='we', columnspan=4)
+
+        # the cells of a page are created once and only their values change
+        self.table = CTkTable(master=self, row=PAGE_SIZE + 1, column=5, command=self.click,
+                              values=[['Link', 'Stored', 'Status', '', ''], *[[''] * 5 for _ in range(PAGE_SIZE)]])
+        self.table.grid(row=1, column=0, padx=10, pady=0, sticky='nsew', columnspan=4)
+
+        self.previous_button = CTkButton(master=self, text='<', command=lambda: self.show_page(self.page - 1), width=30)
+        self.page_label = CTkLabel(master=self, text='')
+        self.next_button = CTkButton(master=self, text='>', command=lambda: self.show_page(self.page + 1), width=30)
+
+        self.previous_button.grid(row=2, column=1, padx=5, pady=5, sticky='e')
+        self.page_label.grid(row=2, column=2, padx=5, pady=5)
+        self.next_button.grid(row=2, column=3, padx=5, pady=5, sticky='w')
+
+        self.load(store.read_tracked_files())
+
+    def load(self, files: list[list]) -> None:
+        self.entries = {file[5]: [str_to_link(*file[:4]), str(file[4]), '', file] for file in files}
+        self.visible = [file_id for file_id, entry in self.entries.items() if matches(entry, self.query)]
+        self.render()
+
+    def add_entry(self, file: list) -> None:
+        if file[5] in self.entries:
+            return
+
+        self.entries[file[5]] = [str_to_link(*file[:4]), str(file[4]), '', file]
+
+        if matches(self.entries[file[5]], self.query):
+            self.visible.append(file[5])
+            self.render()
+
+    def remove_entries(self, ids: list[int]) -> None:
+        for file_id in ids:
+            self.tasks.cancel(file_id)
+            self.entries.pop(file_id, None)
+
+        removed = set(ids)
+        self.visible = [file_id for file_id in self.visible if file_id not in removed]
+        self.render()
+
+    def schedule_search(self, event=None) -> None:
+        # typing restarts the delay, so the rows are filtered once the user pauses
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+
+        self.search_job = self.after(SEARCH_DELAY, self.search)
+
+    def search(self) -> None:
+        self.search_job = None
+        query = self.search_entry.get().strip().lower()
+
+        # a longer query only narrows the rows which matched the previous one
+        candidates = self.visible if query.startswith(self.query) else self.entries
+        self.visible = [file_id for file_id in candidates if matches(self.entries[file_id], query)]
+        self.query = query
+        self.page = 0
+        self.render()
+
+    def show_page(self, page: int) -> None:
+        self.page = page
+        self.render()
+
+    def render(self) -> None:
+        pages = max(1, -(-len(self.visible) // PAGE_SIZE))
+        self.page = min(max(self.page, 0), pages - 1)
+        self.page_ids = self.visible[self.page * PAGE_SIZE:(self.page + 1) * PAGE_SIZE]
+        self.slots = {file_id: row for row, file_id in enumerate(self.page_ids, start=1)}
+
+        for row in range(1, PAGE_SIZE + 1):
+            if row <= len(self.page_ids):
+                link, location, status, file = self.entries[self.page_ids[row - 1]]
+                self.fill_row(row, [link, location, status], self.update_button_image, self.delete_button_image)
             else:
-                temp[key] = val
+                self.fill_row(row, ['', '', ''], None, None)
 
-    def add_buttons(self, index: int, owner_name: str, repo_name: str, branch: str, path: str, location: str) -> None:
-        def wrap():
-            try:
-                download_file(owner_name, repo_name, branch, path, location)
-            except GeneralException as e:
-                define_exception(e, self.master.master.master)
-
-        update_button = CTkButton(master=self,
-                                  text='',
-                                  image=self.update_button_image,
-                                  height=20,
-                                  width=20,
-                                  command=lambda: wrap())
-        update_button.grid(row=index, column=1, padx=5, pady=5)
-
-        delete_button = CTkButton(master=self,
-                                  text='',
-                                  image=self.delete_button_image,
-                                  height=20,
-                                  width=20,
-                                  command=lambda: self.delete_buttons(index, owner_name, repo_name, branch, path,
-                                                                      path.split('/')[-1]))
-        delete_button.grid(row=index, column=2, padx=5, pady=5)
-        # self.grid_rowconfigure(index, weight=0, minsize=30)
-
-        self.row_buttons[index] = [update_button, delete_button]
-
-    def delete_buttons(self, index: int, owner_name: str, repo_name: str, branch: str, path: str, name: str) -> None:
-        if index in self.row_buttons:
-            button1, button2 = self.row_buttons[index]
-            button1.destroy()
-            button2.destroy()
-            del self.row_buttons[index]
-            self.table.delete_row(index)
-            self.change_indexes(index)
-            try:
-                delete_tracked_file(f'{owner_name}{repo_name}{branch}{path}', name)
-            except GeneralException as e:
-                define_exception(e, self.master.master.master)
+        self.page_label.configure(text=f'{self.page + 1} of {pages} ({len(self.visible)} files)')
+        self.previous_button.configure(state='normal' if self.page > 0 else 'disabled')
+        self.next_button.configure(state='normal' if self.page < pages - 1 else 'disabled')
+
+    def fill_row(self, row: int, values: list[str], update_image: CTkImage | None,
+                 delete_image: CTkImage | None) -> None:
+        for column, value in enumerate(values):
+            if self.table.get(row, column) != value:
+                self.table.insert(row, column, value)
+
+        self.table.edit(row, 3, image=update_image)
+        self.table.edit(row, 4, image=delete_image)
+
+    def show_status(self, key, state: str, result: GeneralException | None) -> None:
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return
+
+        entry[2] = describe_status(state, result)
+
+        if key in self.slots:
+            self.table.insert(self.slots[key], 2, entry[2])
+
+    def click(self, cell: dict) -> None:
+        if not 0 < cell['row'] <= len(self.page_ids):
+            return
+
+        file_id = self.page_ids[cell['row'] - 1]
+
+        if cell['column'] == 3:
+            self.update_entry(file_id)
+        elif cell['column'] == 4:
+            self.delete_entry(file_id)
+
+    def update_entry(self, file_id: int) -> None:
+        def show_failure(result: GeneralException) -> None:
+            if isinstance(result, (gv.ErrorException, gv.WarningException)):
+                define_exception(result, self.master)
+
+        # a second click on a row which is still queued takes it out of the queue, a row which is part of a running
+        # "update all" is left to it
+        if not self.tasks.submit(file_id, update_tracked_file, *self.entries[file_id][3][:5], on_done=show_failure):
+            self.tasks.cancel(file_id)
+
+    def delete_entry(self, file_id: int) -> None:
+        store.delete_tracked_files_by_id([file_id])
+        self.remove_entries([file_id])
 
 
 class InputFrame(CTkFrame):
-    def __init__(self, master, table: TableFrame, **kwargs):
+    def __init__(self, master, table: TableFrame, tasks: TaskQueue, **kwargs):
         super().__init__(master, **kwargs)
         self.grid_columnconfigure(0, weight=1)
 
+        self.tasks = tasks
+
         self.entry = CTkEntry(master=self, placeholder_text='Enter a link')
         self.add_button = CTkButton(master=self, text='add', command=lambda: self.add_file_open_window(table),
                                     width=70)
@@ -170,65 +252,67 @@ class InputFrame(CTkFrame):
         self.configure(fg_color='transparent')
 
     def add_file_open_window(self, table: TableFrame) -> None:
-        try:
-            owner_name, repo_name, branch, path, location, location_warning = self.ask_user_for_data()
-        except TypeError:
-            return
-        save_tracked_file(owner_name, repo_name, branch, path, location)
-        table.table.add_row([str_to_link(owner_name, repo_name, branch, path), location], len(table.table.values))
-        table.add_buttons(len(table.table.values), owner_name, repo_name, branch, path, location)
+        def add(owner_name: str, repo_name: str, branch: str, path: str, location: Path,
+                location_warning: CTkMessagebox | None) -> None:
+            save_tracked_file(owner_name, repo_name, branch, path, location)
+            file = next(file for file in store.find_tracked_files_by_link(str_to_link(owner_name, repo_name, branch, path))
+                        if file[4] == str(location))
+            table.add_entry(file)
 
-        if location is NoneType or location_warning is None or location_warning is NoneType or location_warning.get():
-            CTkMessagebox(title='Success',
-                          message=f'File "{path}" was successfully added to the list of tracked files.',
-                          icon='check')
+            if location_warning is None or location_warning.get():
+                CTkMessagebox(title='Success',
+                              message=f'File "{path}" was successfully added to the list of tracked files.',
+                              icon='check')
 
-        try:
-            download_file(owner_name, repo_name, branch, path, location)
-        except GeneralException:
-            pass
+            self.tasks.submit(file[5], download_file, owner_name, repo_name, branch, path, location)
 
-    def ask_user_for_data(self) -> tuple[str, str, str, str, Path, CTkMessagebox] | None:
+        self.ask_user_for_data(add)
+
+    def ask_user_for_data(self, on_done: Callable[[str, str, str, str, Path, CTkMessagebox | None], None]) -> None:
         try:
             owner_name, repo_name, branch, path = parse_link(self.entry.get())
         except ValueError:
             CTkMessagebox(master=self.master, title='Error', message='Wrong link format.', icon='cancel')
             return
 
-        try:
-            validate_data(owner_name, repo_name, branch, path)
-        except GeneralException as e:
-            define_exception(e, self.master)
-            return
+        def ask_location(result: str | GeneralException) -> None:
+            if isinstance(result, GeneralException):
+                define_exception(result, self.master)
+                return
+
+            location_input_dialog = CTkInputDialog(text='Enter a path where you want to store a file.', title='Path')
+            location_file = location_input_dialog.get_input()
 
-        location_input_dialog = CTkInputDialog(text='Enter a path where you want to store a file.', title='Path')
-        location_file = location_input_dialog.get_input()
-        location = validate_path(Path(location_file))
+            if location_file is None:
+                return
 
-        location_warning = None
-        if location == DOWNLOADED_DIRECTORY_PATH:
-            location_warning = CTkMessagebox(master=self.master,
-                                             title='Warning',
-                                             message=f'Location "{location_file}" does not exist. File will be stored in the "{DOWNLOADED_DIRECTORY_PATH}"',
-                                             icon='warning')
+            location = validate_path(Path(location_file))
 
-        return owner_name, repo_name, branch, path, location, location_warning
+            location_warning = None
+            if location == DOWNLOADED_DIRECTORY_PATH:
+                location_warning = CTkMessagebox(master=self.master,
+                                                 title='Warning',
+                                                 message=f'Location "{location_file}" does not exist. File will be stored in the "{DOWNLOADED_DIRECTORY_PATH}"',
+                                                 icon='warning')
+
+            on_done(owner_name, repo_name, branch, path, location, location_warning)
+
+        # the link is checked in the background, the dialogs open once the answer is back
+        self.tasks.submit(('validate', self.entry.get()), validate_data, owner_name, repo_name, branch, path,
+                          on_done=ask_location)
 
     def window_download_file_without_tracking(self) -> None:
-        try:
-            owner_name, repo_name, branch, path, location, location_warning = self.ask_user_for_data()
-        except TypeError:
-            return
+        def download(owner_name: str, repo_name: str, branch: str, path: str, location: Path,
+                     location_warning: CTkMessagebox | None) -> None:
+            if location_warning is None or location_warning.get():
+                self.window_download_file(owner_name, repo_name, branch, path, str(location))
 
-        if location is NoneType or location_warning.get():
-            self.window_download_file(owner_name, repo_name, branch, path, location)
+        self.ask_user_for_data(download)
 
-    def window_download_file(self, owner_name: str, repo_name: str, branch: str, path: str,
-                             location: str) -> CTkMessagebox:
-        try:
-            download_file(owner_name, repo_name, branch, path, location)
-        except GeneralException as e:
-            return define_exception(e, self.master)
+    def window_download_file(self, owner_name: str, repo_name: str, branch: str, path: str, location: str) -> None:
+        self.tasks.submit(('download', str_to_link(owner_name, repo_name, branch, path), location), download_file,
+                          owner_name, repo_name, branch, path, location,
+                          on_done=lambda result: define_exception(result, self.master))
 
     def window_delete_file(self, table: TableFrame) -> None:
         try:
@@ -240,8 +324,11 @@ class InputFrame(CTkFrame):
                           icon='cancel')
             return
 
+        link = str_to_link(owner_name, repo_name, branch, path)
+        ids = [file[5] for file in store.find_tracked_files_by_link(link)]
+
         try:
-            result, index = delete_tracked_file(f'{owner_name}{repo_name}{branch}{path}', path.split('/')[-1])
+            result, index = delete_tracked_file(link, path.split('/')[-1])
         except GeneralException as e:
             define_exception(e, self.master)
             return
@@ -252,8 +339,7 @@ class InputFrame(CTkFrame):
                           message=result,
                           icon='cancel')
         else:
-            table.table.delete_row(index + 1)
-            table.delete_buttons(index + 1, owner_name, repo_name, branch, path, path.split('/')[-1])
+            table.remove_entries(ids)
             CTkMessagebox(master=self.master,
                           title='Success',
                           message=result,
@@ -266,22 +352,65 @@ class InputFrame(CTkFrame):
             CTkMessagebox(master=self.master, title='Error', message='Wrong link format.', icon='cancel')
             return
 
-        try:
-            location = search_location_by_link(f'{owner_name}{repo_name}{branch}{path}', path.split('/')[-1])
-        except GeneralException as e:
-            define_exception(e, self.master)
-            return
+        files = store.find_tracked_files_by_link(str_to_link(owner_name, repo_name, branch, path))
 
-        try:
-            download_file(owner_name, repo_name, branch, path, location)
-        except GeneralException as e:
-            define_exception(e, self.master)
+        if not files:
+            CTkMessagebox(master=self.master, title='Error', message=f'File "{path.split("/")[-1]}" does not exist.',
+                          icon='cancel')
             return
 
-        CTkMessagebox(master=self.master,
-                      title='Success',
-                      message=f'File "{path}" was successfully updated.',
-                      icon='check')
+        def show_result(result: GeneralException) -> None:
+            if isinstance(result, (gv.SuccessException, gv.InfoException)):
+                CTkMessagebox(master=self.master,
+                              title='Success',
+                              message=f'File "{path}" was successfully updated.',
+                              icon='check')
+            else:
+                define_exception(result, self.master)
+
+        self.tasks.submit(files[0][5], download_file, *files[0][:5], on_done=show_result)
+
+
+class TaskFrame(CTkFrame):
+    def __init__(self, master, tasks: TaskQueue, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tasks = tasks
+        self.total = 0
+        self.finished = 0
+
+        self.progress_bar = CTkProgressBar(master=self)
+        self.progress_bar.set(0)
+        self.progress_label = CTkLabel(master=self, text='', width=120)
+        self.update_all_button = CTkButton(master=self, text='update all', command=self.update_all, width=70)
+        self.cancel_button = CTkButton(master=self, text='cancel', command=self.tasks.cancel_all, width=70)
+
+        self.progress_bar.grid(row=0, column=0, padx=10, pady=0, sticky='we')
+        self.progress_label.grid(row=0, column=1, padx=5, pady=0, sticky='e')
+        self.update_all_button.grid(row=0, column=2, padx=5, pady=0, sticky='e')
+        self.cancel_button.grid(row=0, column=3, padx=5, pady=0, sticky='e')
+
+        self.configure(fg_color='transparent')
+
+    def update_all(self) -> None:
+        files = store.read_tracked_files()
+
+        if files:
+            self.tasks.submit_batch([file[5] for file in files], update_rows, files)
+
+    def count(self, state: str) -> None:
+        if state == QUEUED:
+            self.total += 1
+        elif state in (DONE, CANCELLED):
+            self.finished += 1
+
+        self.progress_bar.set(self.finished / self.total if self.total else 0)
+        self.progress_label.configure(text=f'{self.finished} of {self.total} done' if self.total else '')
+
+        # the next batch of work starts counting from zero
+        if self.finished >= self.total:
+            self.total = self.finished = 0
 
 
 class App(CTk):
@@ -310,17 +439,40 @@ class App(CTk):
         self.label = CTkLabel(self, image=image, text='')
         self.label.grid(row=1, column=0, sticky='w', padx=5, pady=5)
 
-        self.table = TableFrame(master=self)
+        self.tasks = TaskQueue(read_setting('workers'))
+
+        self.table = TableFrame(master=self, tasks=self.tasks)
         self.table.grid(row=3, column=0, padx=5, pady=5, sticky="nsew")
 
-        self.input_frame = InputFrame(master=self, table=self.table)
+        self.input_frame = InputFrame(master=self, table=self.table, tasks=self.tasks)
         self.input_frame.grid(row=2, column=0, pady=5, sticky='ew')
 
+        self.task_frame = TaskFrame(master=self, tasks=self.tasks)
+        self.task_frame.grid(row=4, column=0, pady=5, sticky='ew')
+
         self.appearance_frame = AppearanceFrame(master=self)
         self.appearance_frame.grid(row=5, column=0, padx=5, pady=5, sticky="ew")
 
         self.toplevel_window = None
+        self.protocol('WM_DELETE_WINDOW', self.close)
         self.authenticate_on_start()
+        self.after(POLL_INTERVAL, self.poll_tasks)
+
+    def poll_tasks(self) -> None:
+        # worker threads never touch the widgets, their results are applied here on the main loop
+        try:
+            for key, state, result, on_done in self.tasks.poll():
+                self.task_frame.count(state)
+                self.table.show_status(key, state, result)
+
+                if on_done is not None:
+                    on_done(result)
+        finally:
+            self.after(POLL_INTERVAL, self.poll_tasks)
+
+    def close(self) -> None:
+        self.tasks.shutdown()
+        self.destroy()
 
     def open_manual(self) -> None:
         if (self.toplevel_window is None or
@@ -334,15 +486,15 @@ class App(CTk):
             self.open_authentication()
         else:
             try:
-                gv.git = Github(read_credentials())
-                gv.git.get_user().login
+                gv.git = create_clients(read_credentials())
+                get_login()
                 self.show_login()
             except BadCredentialsException:
                 self.open_authentication()
 
     def show_login(self) -> None:
         self.login.configure(state='normal')
-        self.login.insert("0.0", f'Logged in as {gv.git.get_user().login}')
+        self.login.insert("0.0", f'Logged in as {get_login()}')
         self.login.configure(state='disabled')
 
     def open_authentication(self) -> None:
@@ -354,8 +506,8 @@ class App(CTk):
 
         if token is NoneType or token is None and gv.AUTH_FILE_PATH.exists():
             try:
-                gv.git = Github(read_credentials())
-                gv.git.get_user().login
+                gv.git = create_clients(read_credentials())
+                get_login()
             except BadCredentialsException:
                 message = CTkMessagebox(title='Error',
                                         message='You entered invalid secure token.',
@@ -390,6 +542,56 @@ def center_window(window: App | ManualWindow, scaling: float, width=1024, height
     return f"{width}x{height}+{x}+{y}"
 
 
+def update_rows(ids: tuple[int, ...], files: list[list]) -> Iterator[tuple[int, GeneralException]]:
+    # rows which were already queued on their own are left out of the batch
+    ids = set(ids)
+
+    for file, result in update_tracked_files([file for file in files if file[5] in ids]):
+        yield file[5], result
+
+
+def matches(entry: list, query: str) -> bool:
+    return not query or query in entry[0].lower() or query in entry[1].lower()
+
+
+def describe_status(state: str, result: GeneralException | str | None) -> str:
+    if state != DONE:
+        return state
+
+    match result:
+        case gv.UpToDateException():
+            return 'up to date'
+        case gv.DeferredException():
+            return 'deferred'
+        case gv.ErrorException() | gv.WarningException():
+            return 'failed'
+        case gv.SuccessException() | gv.InfoException():
+            return 'updated'
+
+    return 'done'
+
+
+def define_exception(exception: GeneralException, master: CTkFrame | CTk | Misc) -> CTkMessagebox:
+    icon = str
+    title = str
+
+    match exception:
+        case gv.SuccessException():
+            icon = 'check'
+            title = 'Success'
+        case gv.ErrorException():
+            icon = 'cancel'
+            title = 'Error'
+        case gv.WarningException():
+            icon = 'warning'
+            title = 'Warning'
+        case gv.InfoException():
+            icon = 'info'
+            title = 'Info'
+
+    return CTkMessagebox(master=master, icon=icon, title=title, message=str(exception))
+
+
 def app_creator() -> CTk:
     app = App()
     return app
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import global_variables as gv
+import store
+from funcs import parse_link, parse_tree_link, validate_data, validate_path, read_setting
+from global_variables import GeneralException, DOWNLOADED_DIRECTORY_PATH
+from updater import read_remote_blob_shas
+
+
+def parse_import_line(line: str, default_location: Path) -> tuple[str, tuple, Path] | None:
+    # a line holds a link and optionally the location, which may contain spaces
+    parts = line.strip().split(maxsplit=1)
+
+    if not parts or parts[0].startswith('#'):
+        return None
+
+    location = Path(parts[1]) if len(parts) > 1 else default_location
+
+    if '/tree/' in parts[0]:
+        return 'tree', parse_tree_link(parts[0]), location
+
+    return 'file', parse_link(parts[0]), location
+
+
+def describe_location(location: Path, requested: Path) -> str:
+    if location == DOWNLOADED_DIRECTORY_PATH and requested != DOWNLOADED_DIRECTORY_PATH:
+        return f'"{DOWNLOADED_DIRECTORY_PATH}" because "{requested}" does not exist'
+
+    return f'"{location}"'
+
+
+def validate_entry(kind: str, data: tuple) -> GeneralException | None:
+    try:
+        if kind == 'file':
+            validate_data(*data)
+        else:
+            validate_data(*data[:3], None)
+    except GeneralException as e:
+        return e
+
+    return None
+
+
+def import_tracked_links(lines: list[str], default_location: Path, workers: int | None = None) \
+        -> list[tuple[int, GeneralException]]:
+    workers = workers or read_setting('workers')
+    entries = {}
+    report = {}
+
+    for number, line in enumerate(lines, start=1):
+        try:
+            entry = parse_import_line(line, default_location)
+        except ValueError:
+            report[number] = gv.ErrorException(f'Wrong link format: "{line.strip()}".')
+            continue
+
+        if entry is not None:
+            entries[number] = entry
+
+    branches = list({data[:3] for kind, data, location in entries.values() if kind == 'file'})
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # one recursive listing per branch confirms every file in it, the rest is validated one by one
+        listings = dict(zip(branches, executor.map(lambda key: read_remote_blob_shas(*key), branches)))
+        unconfirmed = [number for number, (kind, data, location) in entries.items()
+                       if kind == 'tree' or data[3] not in (listings.get(data[:3]) or {})]
+        errors = dict(zip(unconfirmed, executor.map(lambda number: validate_entry(*entries[number][:2]), unconfirmed)))
+
+    tracked = {tuple(file[:5]) for file in store.read_tracked_files()}
+    files = []
+    trees = []
+
+    for number, (kind, data, requested) in entries.items():
+        if errors.get(number) is not None:
+            report[number] = errors[number]
+            continue
+
+        location = validate_path(requested)
+
+        if kind == 'tree':
+            trees.append((*data, location))
+            report[number] = gv.SuccessException(
+                f'Tree "{store.tree_to_link(*data)}" will be tracked in {describe_location(location, requested)}.')
+        elif (*data, str(location)) in tracked:
+            report[number] = gv.InfoException(f'File "{data[3]}" is already tracked in "{location}".')
+        else:
+            files.append((*data, location))
+            tracked.add((*data, str(location)))
+            report[number] = gv.SuccessException(
+                f'File "{data[3]}" will be tracked in {describe_location(location, requested)}.')
+
+    # every file and tree is written in a single transaction
+    store.save_tracked_files(files, trees)
+
+    return sorted(report.items())
@@ -1,15 +1,22 @@
+import argparse
+import sys
 import textwrap
 from pathlib import Path
 
-from github import Github, BadCredentialsException
+from github import BadCredentialsException
 from requests.exceptions import ConnectionError
-from tabulate import tabulate
 
 import global_variables as gv
+import store
 from funcs import read_tracked_files, validate_path, return_manual, parse_link, read_credentials, \
     delete_all_tracked_files, download_file, delete_tracked_file, authenticate_token, check_download, validate_data, \
-    save_tracked_file, fabricate_links, search_location_by_link
+    save_tracked_file, fabricate_links, search_location_by_link, str_to_link, set_tracked_file_priority, \
+    parse_tree_link, create_clients
 from global_variables import DOWNLOADED_DIRECTORY_PATH, AUTH_FILE_PATH, GeneralException
+from importer import import_tracked_links
+from metadata import get_login
+from trees import expand_all_tracked_trees, expand_tracked_trees
+from updater import update_tracked_files
 
 
 def console_and_return_tracked_files() -> list | None:
@@ -23,12 +30,18 @@ def console_and_return_tracked_files() -> list | None:
         print('No files are currently being tracked.')
         return None
 
-    print(tabulate(fabricate_links(), headers=['№', 'Link', 'Stored'], showindex="always"))
+    # tabulate is only needed for this listing, the import is kept out of the start of the application
+    from tabulate import tabulate
+
+    print(tabulate(fabricate_links(files), headers=['№', 'Link', 'Stored'], showindex="always"))
 
     return files
 
 
 def update_all_tracked_files() -> None:
+    for message in expand_all_tracked_trees():
+        print(message)
+
     try:
         files = read_tracked_files()
     except FileNotFoundError:
@@ -39,14 +52,17 @@ def update_all_tracked_files() -> None:
         print('No files are currently being tracked.')
         return
 
-    for file in files:
-        if check_download(file[0], file[1], file[2], file[3], file[4]):
-            console_download_file(file[0], file[1], file[2], file[3], file[4])
-        else:
-            print(f'File "{file[3]}" is up to date.')
+    unchanged = 0
+
+    for file, result in update_tracked_files(files):
+        print(result)
+        unchanged += isinstance(result, gv.UnchangedException)
 
+    if unchanged:
+        print(f'{unchanged} files already had the same content, so they were not rewritten.')
 
-def ask_user_for_data() -> tuple[str, str, str, str, Path] | None:
+
+def ask_user_for_data() -> tuple[str, str, str, str, Path, str] | None:
     try:
         link = input('Enter a link to the file: ')
         owner_name, repo_name, branch, path = parse_link(link)
@@ -55,7 +71,7 @@ def ask_user_for_data() -> tuple[str, str, str, str, Path] | None:
         return
 
     try:
-        validate_data(owner_name, repo_name, branch, path)
+        blob_sha = validate_data(owner_name, repo_name, branch, path)
     except GeneralException as e:
         print(e)
         return
@@ -67,7 +83,7 @@ def ask_user_for_data() -> tuple[str, str, str, str, Path] | None:
         print(
             f'Location "{input_loc}" does not exist. File will be stored in the "{DOWNLOADED_DIRECTORY_PATH}"')
 
-    return owner_name, repo_name, branch, path, location
+    return owner_name, repo_name, branch, path, location, blob_sha
 
 
 def delete_tracked_file_by_index() -> None:
@@ -78,7 +94,7 @@ def delete_tracked_file_by_index() -> None:
 
     try:
         ch = int(input('Type index of file you want to delete: '))
-        result, index = delete_tracked_file(f'{files[ch][0]}{files[ch][1]}{files[ch][2]}{files[ch][3]}', files[ch][3])
+        result, index = delete_tracked_file(str_to_link(*files[ch][:4]), files[ch][3])
         print(result)
     except (IndexError, ValueError):
         print('Wrong input.')
@@ -98,35 +114,87 @@ def update_tracked_file_by_index() -> None:
             print(f'File "{files[ch][3]}" is up to date.')
     except (IndexError, ValueError):
         print('Wrong input.')
+    except GeneralException as e:
+        print(e)
+
+
+def change_priority_by_index() -> None:
+    files = console_and_return_tracked_files()
+
+    if not files:
+        return
+
+    try:
+        ch = int(input('Type index of file you want to change priority of: '))
+        priority = int(input('Type a new priority (files with higher priority are updated first): '))
+        set_tracked_file_priority(files[ch][5], priority)
+        print(f'Priority of file "{files[ch][3]}" was changed to {priority}.')
+    except (IndexError, ValueError):
+        print('Wrong input.')
 
 
 def add_tracked_file() -> None:
     print('Adding a file.')
 
     try:
-        owner_name, repo_name, branch, path, location = ask_user_for_data()
+        owner_name, repo_name, branch, path, location, blob_sha = ask_user_for_data()
     except TypeError:
         return
 
-    console_download_file(owner_name, repo_name, branch, path, location)
+    console_download_file(owner_name, repo_name, branch, path, location, blob_sha)
 
     save_tracked_file(owner_name, repo_name, branch, path, location)
 
     print(f'File "{path}" was successfully added to the list of tracked files.')
 
 
+def add_tracked_tree() -> None:
+    print('Adding a directory or a glob pattern.')
+
+    try:
+        link = input('Enter a link to the directory or a glob pattern in it: ')
+        owner_name, repo_name, branch, pattern = parse_tree_link(link)
+    except ValueError:
+        print('Wrong link format.')
+        return
+
+    try:
+        validate_data(owner_name, repo_name, branch, None)
+    except GeneralException as e:
+        print(e)
+        return
+
+    input_loc = input('Enter a path where you want to store the files: ')
+    location = validate_path(Path(input_loc))
+
+    if location == DOWNLOADED_DIRECTORY_PATH:
+        print(f'Location "{input_loc}" does not exist. Files will be stored in the "{DOWNLOADED_DIRECTORY_PATH}"')
+
+    tree = store.save_tracked_tree(owner_name, repo_name, branch, pattern, str(location))
+
+    for message in expand_tracked_trees([tree]):
+        print(message)
+
+    # the members are downloaded in parallel like any other tracked files
+    for file, result in update_tracked_files(store.read_tree_members(tree[0])):
+        print(result)
+
+    print(f'Tree "{tree[6]}" was successfully added to the list of tracked files.')
+
+
 def console_download_file_without_tracking() -> None:
     try:
-        owner_name, repo_name, branch, path, location = ask_user_for_data()
+        owner_name, repo_name, branch, path, location, blob_sha = ask_user_for_data()
     except TypeError:
         return
 
-    console_download_file(owner_name, repo_name, branch, path, location)
+    console_download_file(owner_name, repo_name, branch, path, location, blob_sha)
 
 
-def console_download_file(owner_name: str, repo_name: str, branch: str, path: str, location: str) -> None:
+def console_download_file(owner_name: str, repo_name: str, branch: str, path: str, location: str,
+                          blob_sha: str | None = None) -> None:
     try:
-        download_file(owner_name, repo_name, branch, path, location)
+        download_file(owner_name, repo_name, branch, path, location, blob_sha)
     except GeneralException as e:
         print(e)
 
@@ -151,7 +219,7 @@ def update_tracked_file_by_link(link: str) -> None:
     except ValueError:
         raise gv.WarningException('Wrong input.')
 
-    location = search_location_by_link(f'{owner_name}{repo_name}{branch}{path}', path.split('/')[-1])
+    location = search_location_by_link(str_to_link(owner_name, repo_name, branch, path), path.split('/')[-1])
 
     try:
         download_file(owner_name, repo_name, branch, path, location)
@@ -161,21 +229,39 @@ def update_tracked_file_by_link(link: str) -> None:
 
 def console_delete_tracked_file_by_link() -> None:
     try:
-        delete_tracked_file_by_link(input('Enter a link to the file: '))
+        delete_tracked_file_by_link(input('Enter a link to the file or the tracked directory: '))
     except GeneralException as e:
         print(e)
 
 
 def delete_tracked_file_by_link(link: str) -> None:
+    if '/tree/' in link:
+        delete_tracked_tree_by_link(link)
+        return
+
     try:
         owner_name, repo_name, branch, path = parse_link(link)
     except ValueError:
         raise gv.WarningException('Wrong input.')
 
-    result, index = delete_tracked_file(f'{owner_name}{repo_name}{branch}{path}', path.split('/')[-1])
+    result, index = delete_tracked_file(str_to_link(owner_name, repo_name, branch, path), path.split('/')[-1])
     print(result)
 
 
+def delete_tracked_tree_by_link(link: str) -> None:
+    try:
+        owner_name, repo_name, branch, pattern = parse_tree_link(link)
+    except ValueError:
+        raise gv.WarningException('Wrong input.')
+
+    removed = store.delete_tracked_tree_by_link(store.tree_to_link(owner_name, repo_name, branch, pattern))
+
+    if removed == -1:
+        print(f'Tree "{link}" does not exist.')
+    else:
+        print(f'Tree "{link}" was deleted together with {removed} tracked files.')
+
+
 def manual() -> None:
     print(return_manual())
 
@@ -183,7 +269,7 @@ def manual() -> None:
 def main_menu() -> None:
     while True:
         print('=================================================\n'
-              'You are logged in as ' + gv.git.get_user().login)
+              'You are logged in as ' + get_login())
         print(textwrap.dedent('''
             Type 1 if you want to change credentials.
             Type 2 to show all tracked files.
@@ -196,6 +282,8 @@ def main_menu() -> None:
             Type 9 to delete a tracked file by link.
             Type 10 to delete all tracked files.
             Type 11 to see the manual (help).
+            Type 12 to change priority of a tracked file by index.
+            Type 13 to add a tracked directory or glob pattern and download it.
             Type 0 to exit.
         '''))
         ch = input('Type: ')
@@ -224,6 +312,10 @@ def main_menu() -> None:
                 console_delete_all_tracked_files()
             case '11':
                 manual()
+            case '12':
+                change_priority_by_index()
+            case '13':
+                add_tracked_tree()
             case '0':
                 raise KeyboardInterrupt
             case _:
@@ -241,15 +333,65 @@ def console_authenticate_token() -> None:
         console_authenticate_token()
 
 
+def console_import_tracked_links(source: str, location: str, download: bool) -> None:
+    if not AUTH_FILE_PATH.exists():
+        print('No token is saved. Run the application without arguments to authenticate first.')
+        return
+
+    try:
+        gv.git = create_clients(read_credentials())
+        get_login()
+    except BadCredentialsException:
+        print('Saved token is invalid. Run the application without arguments to authenticate again.')
+        return
+
+    if source == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(source, 'r') as file:
+            lines = file.readlines()
+
+    report = import_tracked_links(lines, Path(location))
+
+    for number, result in report:
+        print(f'{number}: {result}')
+
+    imported = sum(isinstance(result, gv.SuccessException) for number, result in report)
+    print(f'{imported} of {len(report)} entries were imported.')
+
+    if download:
+        update_all_tracked_files()
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Keeps files from GitHub repositories updated. '
+                                                 'Without arguments the interactive menu is shown.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    importer = subparsers.add_parser('import', help='track many links at once')
+    importer.add_argument('source', help='file with a link and an optional location on every line, "-" reads stdin')
+    importer.add_argument('--location', default=str(DOWNLOADED_DIRECTORY_PATH),
+                          help='location of the lines which do not name one')
+    importer.add_argument('--download', action='store_true', help='update every tracked file after the import')
+
+    return parser.parse_args()
+
+
 def main() -> None:
+    arguments = parse_arguments()
+
+    if arguments.command == 'import':
+        console_import_tracked_links(arguments.source, arguments.location, arguments.download)
+        return
+
     print('Github downloader v2.0 by revel111.')
 
     if not AUTH_FILE_PATH.exists():
         console_authenticate_token()
     else:
         try:
-            gv.git = Github(read_credentials())
-            gv.git.get_user().login
+            gv.git = create_clients(read_credentials())
+            get_login()
         except BadCredentialsException:
             console_authenticate_token()
 
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from github import GithubException
+from github.Repository import Repository
+
+import global_variables as gv
+from tokens import token_pool
+
+# seconds an entry of each kind stays fresh and the number of entries kept of it
+LOGIN_TTL = 3600
+REPOSITORY_TTL = 600
+BRANCH_TTL = 300
+MAX_REPOSITORIES = 256
+MAX_BRANCHES = 1024
+
+
+class TTLCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key, load: Callable):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        # failed lookups raise and are not remembered, so a missing object is looked up again next time
+        value = load()
+
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+logins = TTLCache(LOGIN_TTL, 1)
+repositories = TTLCache(REPOSITORY_TTL, MAX_REPOSITORIES)
+branches = TTLCache(BRANCH_TTL, MAX_BRANCHES)
+
+
+def clear() -> None:
+    # entries depend on the token, a new client starts with empty caches
+    for cache in (logins, repositories, branches):
+        cache.clear()
+
+
+def get_login() -> str:
+    return logins.get('login', lambda: gv.git.get_user().login)
+
+
+def get_repository(owner_name: str, repo_name: str) -> Repository:
+    # the full repository object also holds the default branch
+    return repositories.get((owner_name, repo_name), lambda: token_pool.get_repo(owner_name, repo_name, lazy=False))
+
+
+def branch_exists(owner_name: str, repo_name: str, branch: str) -> bool:
+    try:
+        return branches.get((owner_name, repo_name, branch),
+                            lambda: bool(get_repository(owner_name, repo_name).get_branch(branch)))
+    except GithubException:
+        return False
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+import global_variables as gv
+import store
+from budget import budget
+from connection import response_hooks
+from global_variables import GeneralException
+from tokens import token_pool
+
+# repository endpoints which are counted on their own, everything else below a repository counts as "repository"
+REPOSITORY_ENDPOINTS = ('contents', 'branches', 'compare', 'commits', 'tarball', 'zipball')
+FILE_RESULTS = ('checked', 'updated', 'up_to_date', 'unchanged', 'failed', 'deferred')
+
+
+def request_kind(url: str) -> str:
+    parts = urlparse(url).path.strip('/').split('/')
+
+    if parts[-1] == 'graphql':
+        return 'graphql'
+    if 'repos' in parts:
+        # enterprise servers put the api under a prefix, the repository path starts after "repos"
+        rest = parts[parts.index('repos') + 3:]
+
+        if rest[:2] == ['git', 'trees']:
+            return 'trees'
+        if rest and rest[0] in REPOSITORY_ENDPOINTS:
+            return rest[0]
+
+        return 'repository'
+    if parts[0] in ('user', 'users'):
+        return 'users'
+
+    return 'other'
+
+
+def classify_result(result: GeneralException) -> str:
+    if isinstance(result, gv.DeferredException):
+        return 'deferred'
+    # the file was downloaded, but its content was identical, so it was not written
+    if isinstance(result, gv.UnchangedException):
+        return 'unchanged'
+    if isinstance(result, gv.UpToDateException):
+        return 'up_to_date'
+    if isinstance(result, (gv.ErrorException, gv.WarningException)):
+        return 'failed'
+
+    return 'updated'
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.downloaded_bytes = 0
+        self.cycles = 0
+        self.files = dict.fromkeys(FILE_RESULTS, 0)
+        self.last_cycle = {'duration': None, 'finished': None, 'files': dict.fromkeys(FILE_RESULTS, 0)}
+
+    def observe(self, verb: str, url: str, status: int, headers, identity: str) -> None:
+        key = (request_kind(url), status)
+
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def add_downloaded_bytes(self, count: int) -> None:
+        with self.lock:
+            self.downloaded_bytes += count
+
+    def record_cycle(self, results: list[tuple[list, GeneralException]], duration: float) -> dict[str, int]:
+        files = dict.fromkeys(FILE_RESULTS, 0)
+        files['checked'] = len(results)
+
+        for file, result in results:
+            files[classify_result(result)] += 1
+
+        with self.lock:
+            self.cycles += 1
+            for name, count in files.items():
+                self.files[name] += count
+            self.last_cycle = {'duration': duration, 'finished': time.time(), 'files': files}
+
+        return files
+
+    def snapshot(self) -> dict:
+        now = time.time()
+
+        with self.lock:
+            snapshot = {
+                'requests': [{'kind': kind, 'status': status, 'count': count}
+                             for (kind, status), count in sorted(self.requests.items())],
+                'downloaded_bytes': self.downloaded_bytes,
+                'cycles': self.cycles,
+                'files': dict(self.files),
+                'last_cycle': {**self.last_cycle, 'files': dict(self.last_cycle['files'])},
+            }
+
+        snapshot['rate_limit'] = {'limit': budget.limit, 'remaining': budget.remaining, 'reset': budget.reset}
+        snapshot['tokens'] = token_pool.describe()
+        # files which were never checked have no staleness yet
+        snapshot['staleness'] = [{'link': store.str_to_link(*file[:4]), 'location': file[4], 'seconds': now - file[7]}
+                                 for file in store.read_tracked_files() if file[7] is not None]
+
+        return snapshot
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_metric(name: str, value, labels: dict[str, str] | None = None) -> str:
+    if labels:
+        name += '{' + ','.join(f'{key}="{escape_label(label)}"' for key, label in labels.items()) + '}'
+
+    return f'{name} {"NaN" if value is None else value}'
+
+
+def render_prometheus(snapshot: dict) -> str:
+    lines = []
+
+    def family(name: str, kind: str, description: str, samples: list[tuple[dict | None, object]]) -> None:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(format_metric(name, value, labels) for labels, value in samples)
+
+    family('github_downloader_api_requests_total', 'counter', 'GitHub requests by endpoint kind and status.',
+           [({'kind': entry['kind'], 'status': str(entry['status'])}, entry['count'])
+            for entry in snapshot['requests']])
+    family('github_downloader_rate_limit_remaining', 'gauge', 'Requests left in the current rate limit window.',
+           [(None, snapshot['rate_limit']['remaining'])])
+    family('github_downloader_rate_limit_limit', 'gauge', 'Requests allowed per rate limit window.',
+           [(None, snapshot['rate_limit']['limit'])])
+    family('github_downloader_rate_limit_reset_timestamp_seconds', 'gauge', 'Time the rate limit window resets.',
+           [(None, snapshot['rate_limit']['reset'])])
+    family('github_downloader_token_rate_limit_remaining', 'gauge',
+           'Requests left per token of the pool, identified by a digest prefix.',
+           [({'token': entry['token']}, entry['remaining']) for entry in snapshot['tokens']])
+    family('github_downloader_token_revoked', 'gauge', 'Whether a token of the pool was rejected by GitHub.',
+           [({'token': entry['token']}, int(entry['revoked'])) for entry in snapshot['tokens']])
+    family('github_downloader_cycles_total', 'counter', 'Update cycles run since the start.',
+           [(None, snapshot['cycles'])])
+    family('github_downloader_cycle_duration_seconds', 'gauge', 'Duration of the last update cycle.',
+           [(None, snapshot['last_cycle']['duration'])])
+    family('github_downloader_last_cycle_timestamp_seconds', 'gauge', 'Time the last update cycle finished.',
+           [(None, snapshot['last_cycle']['finished'])])
+    family('github_downloader_files_total', 'counter', 'Tracked files handled since the start by result.',
+           [({'result': name}, count) for name, count in snapshot['files'].items()])
+    family('github_downloader_last_cycle_files', 'gauge', 'Tracked files handled in the last cycle by result.',
+           [({'result': name}, count) for name, count in snapshot['last_cycle']['files'].items()])
+    family('github_downloader_downloaded_bytes_total', 'counter', 'Bytes of downloaded files.',
+           [(None, snapshot['downloaded_bytes'])])
+    family('github_downloader_file_staleness_seconds', 'gauge', 'Seconds since a tracked file was last checked.',
+           [({'link': entry['link'], 'location': entry['location']}, round(entry['seconds'], 3))
+            for entry in snapshot['staleness']])
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+
+        if path == '/metrics':
+            self.reply('text/plain; version=0.0.4', render_prometheus(metrics.snapshot()))
+        elif path == '/metrics.json':
+            self.reply('application/json', json.dumps(metrics.snapshot()))
+        else:
+            self.send_error(404)
+
+    def reply(self, content_type: str, text: str) -> None:
+        body = text.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int):
+        super().__init__((host, port), MetricsHandler)
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+metrics = Metrics()
+
+response_hooks.append(metrics.observe)
@@ -0,0 +1,107 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from github import GithubException
+
+import global_variables as gv
+import store
+from budget import budget
+from funcs import read_setting
+from global_variables import GeneralException
+from tokens import token_pool
+
+# number of recent commits of a file which its first poll interval is learned from
+HISTORY_LENGTH = 10
+# an interval shrinks by this factor when the file changed and grows by it when it did not
+SHRINK_FACTOR = 2.0
+GROWTH_FACTOR = 1.5
+# the longest the daemon sleeps, so newly tracked files are picked up quickly
+MAX_IDLE = 60
+
+
+def clamp_interval(interval: float) -> float:
+    return min(read_setting('poll_interval_max'), max(read_setting('poll_interval_min'), interval))
+
+
+def add_jitter(interval: float) -> float:
+    jitter = read_setting('poll_jitter')
+
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def learn_interval(owner_name: str, repo_name: str, branch: str, path: str) -> float:
+    try:
+        commits = token_pool.get_repo(owner_name, repo_name).get_commits(path=path, sha=branch)
+        dates = [commit.commit.committer.date.timestamp() for commit in commits.get_page(0)[:HISTORY_LENGTH]]
+    except (GithubException, GeneralException, OSError):
+        return read_setting('poll_interval_min')
+
+    if not dates:
+        return read_setting('poll_interval_min')
+
+    # the average gap between recent commits, a file with a single commit is as old as that commit
+    if len(dates) == 1:
+        return clamp_interval(time.time() - dates[0])
+
+    return clamp_interval((dates[0] - dates[-1]) / (len(dates) - 1))
+
+
+def next_interval(interval: float, result: GeneralException) -> float:
+    if isinstance(result, gv.UpToDateException):
+        return clamp_interval(interval * GROWTH_FACTOR)
+    if isinstance(result, (gv.SuccessException, gv.InfoException)):
+        return clamp_interval(interval / SHRINK_FACTOR)
+
+    return interval
+
+
+def next_due(interval: float, result: GeneralException) -> float:
+    now = time.time()
+
+    if isinstance(result, gv.DeferredException):
+        return now + budget.seconds_until_reset()
+    # failed checks are retried soon without changing what was learned about the file
+    if isinstance(result, (gv.ErrorException, gv.WarningException)):
+        return now + add_jitter(read_setting('poll_interval_min'))
+
+    return now + add_jitter(interval)
+
+
+def reschedule_tracked_files(results: list[tuple[list, GeneralException]]) -> None:
+    # the history of a file costs a request, so it is only read for files which were synced, failed and deferred
+    # files would spend the reserve which is left after an exhausted cycle
+    unknown = [file for file, result in results
+               if file[8] is None and not isinstance(result, (gv.ErrorException, gv.WarningException))]
+
+    with ThreadPoolExecutor(max_workers=read_setting('workers')) as executor:
+        learned = dict(zip((file[5] for file in unknown), executor.map(
+            lambda file: None if token_pool.is_exhausted(file[0]) else learn_interval(*file[:4]), unknown)))
+
+    updates = []
+    for file, result in results:
+        if file[8] is not None:
+            interval = next_interval(file[8], result)
+        elif learned.get(file[5]) is not None:
+            interval = learned[file[5]]
+        else:
+            # the interval stays unknown and is learned after a later sync, until then the file is polled often
+            updates.append({'id': file[5], 'next_due': next_due(read_setting('poll_interval_min'), result)})
+            continue
+
+        updates.append({'id': file[5], 'poll_interval': interval, 'next_due': next_due(interval, result)})
+
+    store.update_tracked_files(updates)
+
+
+def read_due_tracked_files() -> list[list]:
+    return store.read_due_tracked_files(time.time())
+
+
+def seconds_until_next_due() -> float:
+    if budget.is_exhausted():
+        return budget.seconds_until_reset()
+
+    due = store.read_next_due()
+
+    return MAX_IDLE if due is None else min(MAX_IDLE, max(1.0, due - time.time()))
@@ -0,0 +1,43 @@
+import argparse
+import hashlib
+import hmac
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+def send_payload(url: str, secret: str, payload: bytes, event: str) -> tuple[int, str]:
+    signature = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    request = urllib.request.Request(url, data=payload, method='POST', headers={
+        'Content-Type': 'application/json',
+        'X-GitHub-Event': event,
+        'X-Hub-Signature-256': f'sha256={signature}',
+    })
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Posts a recorded GitHub webhook payload to the auto updater.')
+    parser.add_argument('payload', nargs='?', type=Path, default=Path(__file__).parent / 'push_payload.json',
+                        help='recorded payload, the sample push payload by default')
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help='address of the webhook receiver')
+    parser.add_argument('--secret', required=True, help='the "webhook_secret" setting of the auto updater')
+    parser.add_argument('--event', default='push', help='value of the X-GitHub-Event header')
+    args = parser.parse_args()
+
+    try:
+        status, message = send_payload(args.url, args.secret, args.payload.read_bytes(), args.event)
+    except urllib.error.URLError as e:
+        sys.exit(f'Webhook receiver is not reachable: {e.reason}')
+
+    print(status, message)
+
+
+if __name__ == '__main__':
+    main()
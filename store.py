@@ -0,0 +1,282 @@
+import sqlite3
+from contextlib import closing
+
+import global_variables as gv
+from global_variables import DATABASE_FILE_PATH, FILES_FILE_PATH
+
+COLUMNS = 'owner_name, repo_name, branch, path, location, id, priority, last_checked, poll_interval, next_due, ' \
+          'synced_head'
+TREE_COLUMNS = 'id, owner_name, repo_name, branch, pattern, location, link, next_due'
+
+# every entry upgrades the schema by one version, PRAGMA user_version holds the number of applied entries
+MIGRATIONS = [
+    '''
+    CREATE TABLE tracked_files (
+        id INTEGER PRIMARY KEY,
+        owner_name TEXT NOT NULL,
+        repo_name TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        path TEXT NOT NULL,
+        location TEXT NOT NULL,
+        link TEXT NOT NULL,
+        blob_sha TEXT,
+        last_checked REAL,
+        last_updated REAL,
+        UNIQUE (owner_name, repo_name, branch, path, location)
+    );
+    CREATE INDEX tracked_files_link ON tracked_files (link);
+    ''',
+    '''
+    ALTER TABLE tracked_files ADD COLUMN priority INTEGER NOT NULL DEFAULT 0;
+    ''',
+    '''
+    ALTER TABLE tracked_files ADD COLUMN poll_interval REAL;
+    ALTER TABLE tracked_files ADD COLUMN next_due REAL;
+    CREATE INDEX tracked_files_next_due ON tracked_files (next_due);
+    ''',
+    '''
+    ALTER TABLE tracked_files ADD COLUMN synced_head TEXT;
+    ''',
+    '''
+    CREATE TABLE tracked_trees (
+        id INTEGER PRIMARY KEY,
+        owner_name TEXT NOT NULL,
+        repo_name TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        pattern TEXT NOT NULL,
+        location TEXT NOT NULL,
+        link TEXT NOT NULL,
+        next_due REAL,
+        UNIQUE (owner_name, repo_name, branch, pattern, location)
+    );
+    CREATE INDEX tracked_trees_link ON tracked_trees (link);
+    ALTER TABLE tracked_files ADD COLUMN tree_id INTEGER;
+    CREATE INDEX tracked_files_tree_id ON tracked_files (tree_id);
+    ''',
+]
+
+def str_to_link(owner_name: str, repo_name: str, branch: str, path: str) -> str:
+    return f'https://github.com/{owner_name}/{repo_name}/blob/{branch}/{path}'
+
+
+def tree_to_link(owner_name: str, repo_name: str, branch: str, pattern: str) -> str:
+    return f'https://github.com/{owner_name}/{repo_name}/tree/{branch}/{pattern}'.rstrip('/')
+
+
+def connect() -> sqlite3.Connection:
+    gv.FILES_DIRECTORY_PATH.mkdir(exist_ok=True)
+
+    connection = sqlite3.connect(DATABASE_FILE_PATH, timeout=30)
+
+    if connection.execute('PRAGMA user_version').fetchone()[0] < len(MIGRATIONS):
+        migrate(connection)
+
+    return connection
+
+
+def migrate(connection: sqlite3.Connection) -> None:
+    # the write lock is taken first, so the daemon and the GUI or the CLI never migrate the same file at once
+    connection.execute('BEGIN IMMEDIATE')
+    imported = False
+
+    try:
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+
+        # executescript() commits before it runs, the statements run one by one so a failed migration is undone whole
+        for migration in MIGRATIONS[version:]:
+            for statement in migration.split(';'):
+                if statement.strip():
+                    connection.execute(statement)
+
+        if version == 0:
+            imported = import_files_txt(connection)
+
+        connection.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+    # the old file is only set aside once its entries were committed
+    if imported:
+        FILES_FILE_PATH.rename(FILES_FILE_PATH.with_suffix('.txt.migrated'))
+
+
+def import_files_txt(connection: sqlite3.Connection) -> bool:
+    if not FILES_FILE_PATH.exists():
+        return False
+
+    entries = []
+    with open(FILES_FILE_PATH, 'r') as file:
+        for line in file:
+            # the old format is space separated, everything after the path is taken as the location
+            parts = line.rstrip('\n').split(' ', 4)
+
+            if len(parts) == 5:
+                entries.append(tuple(parts))
+
+    insert_tracked_files(connection, entries)
+
+    return True
+
+
+def insert_tracked_files(connection: sqlite3.Connection, entries: list[tuple[str, str, str, str, str]],
+                         tree_id: int | None = None) -> None:
+    connection.executemany(
+        'INSERT OR IGNORE INTO tracked_files (owner_name, repo_name, branch, path, location, link, tree_id) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [(*entry[:5], str_to_link(*entry[:4]), tree_id) for entry in entries])
+
+
+def insert_tracked_trees(connection: sqlite3.Connection, entries: list[tuple[str, str, str, str, str]]) -> None:
+    connection.executemany(
+        'INSERT OR IGNORE INTO tracked_trees (owner_name, repo_name, branch, pattern, location, link) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [(*entry[:5], tree_to_link(*entry[:4])) for entry in entries])
+
+
+def read_tracked_files() -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(f'SELECT {COLUMNS} FROM tracked_files ORDER BY id')]
+
+
+def read_due_tracked_files(now: float) -> list[list]:
+    # entries which were never scheduled are due immediately
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {COLUMNS} FROM tracked_files WHERE next_due IS NULL OR next_due <= ? '
+            'ORDER BY priority DESC, next_due', (now,))]
+
+
+def read_next_due() -> float | None:
+    with closing(connect()) as connection:
+        return connection.execute('SELECT MIN(COALESCE(next_due, 0)) FROM tracked_files').fetchone()[0]
+
+
+def find_tracked_files(owner_name: str, repo_name: str, branch: str, path: str) -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {COLUMNS} FROM tracked_files '
+            'WHERE owner_name = ? AND repo_name = ? AND branch = ? AND path = ? ORDER BY id',
+            (owner_name, repo_name, branch, path))]
+
+
+def find_tracked_files_by_branch(owner_name: str, repo_name: str, branch: str) -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {COLUMNS} FROM tracked_files WHERE owner_name = ? AND repo_name = ? AND branch = ? ORDER BY id',
+            (owner_name, repo_name, branch))]
+
+
+def find_tracked_files_by_link(link: str) -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {COLUMNS} FROM tracked_files WHERE link = ? ORDER BY id', (link,))]
+
+
+def save_tracked_files(entries: list[tuple[str, str, str, str, str]],
+                       trees: list[tuple[str, str, str, str, str]] = ()) -> None:
+    # trees which are tracked together with the files are written in the same transaction
+    with closing(connect()) as connection, connection:
+        insert_tracked_files(connection, [(*entry[:4], str(entry[4])) for entry in entries])
+        insert_tracked_trees(connection, [(*entry[:4], str(entry[4])) for entry in trees])
+
+
+def delete_tracked_files_by_link(link: str) -> int:
+    with closing(connect()) as connection, connection:
+        row = connection.execute('SELECT MIN(id) FROM tracked_files WHERE link = ?', (link,)).fetchone()
+
+        if row[0] is None:
+            return -1
+
+        index = connection.execute('SELECT COUNT(*) FROM tracked_files WHERE id < ?', (row[0],)).fetchone()[0]
+        connection.execute('DELETE FROM tracked_files WHERE link = ?', (link,))
+
+        return index
+
+
+def delete_tracked_files(owner_name: str, repo_name: str, branch: str, path: str) -> int:
+    return delete_tracked_files_by_link(str_to_link(owner_name, repo_name, branch, path))
+
+
+def delete_tracked_files_by_id(ids: list[int]) -> None:
+    with closing(connect()) as connection, connection:
+        connection.executemany('DELETE FROM tracked_files WHERE id = ?', [(file_id,) for file_id in ids])
+
+
+def delete_all_tracked_files() -> int:
+    with closing(connect()) as connection, connection:
+        connection.execute('DELETE FROM tracked_trees')
+        return connection.execute('DELETE FROM tracked_files').rowcount
+
+
+def update_tracked_files(updates: list[dict]) -> None:
+    # every update holds the id of the entry and the metadata columns which are changed
+    with closing(connect()) as connection, connection:
+        for update in updates:
+            columns = [column for column in update if column != 'id']
+            connection.execute(
+                f'UPDATE tracked_files SET {", ".join(f"{column} = ?" for column in columns)} WHERE id = ?',
+                [update[column] for column in columns] + [update['id']])
+
+
+def save_tracked_tree(owner_name: str, repo_name: str, branch: str, pattern: str, location: str) -> list:
+    with closing(connect()) as connection, connection:
+        insert_tracked_trees(connection, [(owner_name, repo_name, branch, pattern, location)])
+
+        return list(connection.execute(
+            f'SELECT {TREE_COLUMNS} FROM tracked_trees '
+            'WHERE owner_name = ? AND repo_name = ? AND branch = ? AND pattern = ? AND location = ?',
+            (owner_name, repo_name, branch, pattern, location)).fetchone())
+
+
+def read_tracked_trees() -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(f'SELECT {TREE_COLUMNS} FROM tracked_trees ORDER BY id')]
+
+
+def read_due_tracked_trees(now: float) -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {TREE_COLUMNS} FROM tracked_trees WHERE next_due IS NULL OR next_due <= ? ORDER BY id', (now,))]
+
+
+def read_tree_members(tree_id: int) -> list[list]:
+    with closing(connect()) as connection:
+        return [list(row) for row in connection.execute(
+            f'SELECT {COLUMNS} FROM tracked_files WHERE tree_id = ? ORDER BY id', (tree_id,))]
+
+
+def save_tree_members(tree_id: int, entries: list[tuple[str, str, str, str, str]]) -> list[str]:
+    # a file which is already tracked on its own or by another tree stays with it, so deleting this tree never
+    # untracks it, the paths which became members are returned
+    with closing(connect()) as connection, connection:
+        insert_tracked_files(connection, entries, tree_id)
+        members = {row[0] for row in connection.execute('SELECT path FROM tracked_files WHERE tree_id = ?', (tree_id,))}
+
+        return [entry[3] for entry in entries if entry[3] in members]
+
+
+def delete_tracked_tree_by_link(link: str) -> int:
+    # the members are forgotten together with the tree, their local copies are kept
+    with closing(connect()) as connection, connection:
+        ids = [row[0] for row in connection.execute('SELECT id FROM tracked_trees WHERE link = ?', (link,))]
+
+        if not ids:
+            return -1
+
+        removed = 0
+        for tree_id in ids:
+            removed += connection.execute('DELETE FROM tracked_files WHERE tree_id = ?', (tree_id,)).rowcount
+            connection.execute('DELETE FROM tracked_trees WHERE id = ?', (tree_id,))
+
+        return removed
+
+
+def update_tracked_trees(updates: list[dict]) -> None:
+    with closing(connect()) as connection, connection:
+        for update in updates:
+            columns = [column for column in update if column != 'id']
+            connection.execute(
+                f'UPDATE tracked_trees SET {", ".join(f"{column} = ?" for column in columns)} WHERE id = ?',
+                [update[column] for column in columns] + [update['id']])
@@ -0,0 +1,167 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Hashable, Iterator
+
+import global_variables as gv
+from global_variables import GeneralException
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+
+
+class TaskQueue:
+    # network work runs on worker threads, its events are collected here and handed to the
+    # Tk main loop by poll(), because Tk widgets may only be touched from the thread that created them
+    def __init__(self, workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.futures = {}
+        # a batch which already runs is stopped through its event, it cannot be cancelled as a whole
+        self.stops = {}
+        # keys which are still queued or running in a batch, a key is never worked on by two tasks at once
+        self.members = {}
+
+    def submit(self, key: Hashable, function: Callable[..., GeneralException | None], *args,
+               on_done: Callable[[GeneralException | None], None] | None = None) -> bool:
+        with self.lock:
+            # a row which already has queued work is not queued twice
+            if key in self.futures or key in self.members:
+                return False
+
+            self.events.put((key, QUEUED, None, None))
+            self.futures[key] = self.executor.submit(self.run, key, function, args, on_done)
+
+        return True
+
+    def submit_batch(self, keys: list[Hashable], function: Callable[..., Iterator[tuple[Hashable, GeneralException]]],
+                     *args) -> int:
+        # a batch is called with the keys it was given and yields a result per key as it goes, it stops early once
+        # the queue is cancelled, keys which already have work of their own are left out
+        with self.lock:
+            keys = tuple(key for key in keys if key not in self.futures and key not in self.members)
+
+            if not keys:
+                return 0
+
+            for key in keys:
+                self.members[key] = keys
+                self.events.put((key, QUEUED, None, None))
+
+            self.stops[keys] = threading.Event()
+            self.futures[keys] = self.executor.submit(self.run_batch, keys, function, args)
+
+        return len(keys)
+
+    def run(self, key: Hashable, function: Callable, args: tuple, on_done: Callable | None) -> None:
+        self.events.put((key, RUNNING, None, None))
+
+        try:
+            result = function(*args)
+        except GeneralException as e:
+            result = e
+        except Exception as e:
+            result = gv.ErrorException(str(e))
+        finally:
+            with self.lock:
+                self.futures.pop(key, None)
+
+        self.events.put((key, DONE, result, on_done))
+
+    def run_batch(self, keys: tuple, function: Callable, args: tuple) -> None:
+        pending = set(keys)
+        results = function(keys, *args)
+
+        try:
+            for key in keys:
+                self.events.put((key, RUNNING, None, None))
+
+            for key, result in results:
+                pending.discard(key)
+                self.release(key)
+                self.events.put((key, DONE, result, None))
+
+                if self.stops[keys].is_set():
+                    break
+        except Exception as e:
+            for key in pending:
+                self.events.put((key, DONE, gv.ErrorException(str(e)), None))
+            pending.clear()
+        finally:
+            # closing the generator lets it finish the work in flight and save what it did
+            results.close()
+
+            with self.lock:
+                self.futures.pop(keys, None)
+                self.stops.pop(keys, None)
+
+            for key in keys:
+                self.release(key)
+
+        for key in pending:
+            self.events.put((key, CANCELLED, None, None))
+
+    def release(self, key: Hashable) -> None:
+        with self.lock:
+            self.members.pop(key, None)
+
+    def cancel(self, key: Hashable) -> bool:
+        with self.lock:
+            future = self.futures.get(key)
+
+            # work which already started is finished, only queued work can be dropped
+            if future is None or not future.cancel():
+                return False
+
+            del self.futures[key]
+
+        self.events.put((key, CANCELLED, None, None))
+        return True
+
+    def cancel_all(self) -> None:
+        with self.lock:
+            keys = list(self.futures)
+
+            for stop in self.stops.values():
+                stop.set()
+
+        for key in keys:
+            if key not in self.stops:
+                self.cancel(key)
+                continue
+
+            with self.lock:
+                future: Future | None = self.futures.get(key)
+
+                if future is None or not future.cancel():
+                    continue
+
+                # a batch which never started cancels every key in it
+                self.futures.pop(key, None)
+                self.stops.pop(key, None)
+
+                for member in key:
+                    self.members.pop(member, None)
+
+            for member in key:
+                self.events.put((member, CANCELLED, None, None))
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.futures)
+
+    def poll(self) -> list[tuple[Hashable, str, GeneralException | None, Callable | None]]:
+        events = []
+
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self) -> None:
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
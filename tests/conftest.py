@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# the modules live in the repository root and read their data directory when they are imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('GITHUB_DOWNLOADER_DATA', tempfile.mkdtemp(prefix='github-downloader-tests-'))
+
+
+@pytest.fixture
+def data_directory(tmp_path, monkeypatch):
+    # the database and the old files.txt are kept in a directory of their own for every test
+    import global_variables as gv
+    import store
+
+    monkeypatch.setattr(gv, 'FILES_DIRECTORY_PATH', tmp_path)
+    monkeypatch.setattr(store, 'DATABASE_FILE_PATH', tmp_path / 'files.db')
+    monkeypatch.setattr(store, 'FILES_FILE_PATH', tmp_path / 'files.txt')
+
+    return tmp_path
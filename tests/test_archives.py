@@ -0,0 +1,73 @@
+import hashlib
+import io
+import tarfile
+
+import pytest
+
+import archives
+
+
+def blob_sha(content: bytes) -> str:
+    return hashlib.sha1(f'blob {len(content)}\0'.encode() + content).hexdigest()
+
+
+def build_archive(members: dict[str, bytes]) -> io.BytesIO:
+    archive = io.BytesIO()
+
+    with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+        directory = tarfile.TarInfo('owner-repo-0123abc')
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+
+        for name, content in members.items():
+            info = tarfile.TarInfo(f'owner-repo-0123abc/{name}')
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    archive.seek(0)
+    return archive
+
+
+@pytest.fixture
+def written(monkeypatch):
+    # the blob hashes and the blob cache of the data directory are left alone
+    written = []
+    monkeypatch.setattr(archives, 'remember_blob_sha', lambda target, sha: None)
+    monkeypatch.setattr(archives, 'record_write', written.append)
+    monkeypatch.setattr(archives, 'read_setting', lambda name: 0)
+
+    return written
+
+
+def test_only_requested_paths_are_written_to_their_targets(tmp_path, written):
+    locations = [tmp_path / 'first', tmp_path / 'second', tmp_path / 'third']
+    for location in locations:
+        location.mkdir()
+
+    archive = build_archive({'configs/nested/app.yaml': b'app', 'readme.md': b'readme', 'untracked.txt': b'untracked',
+                             '../escaped.txt': b'escaped', 'configs/../../outside.txt': b'outside'})
+    targets = {'configs/nested/app.yaml': (blob_sha(b'app'), [locations[0] / 'app.yaml']),
+               'readme.md': (None, [locations[1] / 'readme.md', locations[2] / 'readme.md'])}
+
+    extracted = archives.extract_paths(archive, targets)
+
+    assert extracted == {'configs/nested/app.yaml': [], 'readme.md': []}
+    assert sorted(path.relative_to(tmp_path).as_posix() for path in tmp_path.rglob('*') if path.is_file()) == \
+        ['first/app.yaml', 'second/readme.md', 'third/readme.md']
+    assert (locations[0] / 'app.yaml').read_bytes() == b'app'
+    assert (locations[2] / 'readme.md').read_bytes() == b'readme'
+    assert not (tmp_path.parent / 'escaped.txt').exists() and not (tmp_path.parent / 'outside.txt').exists()
+    assert sorted(written) == sorted([locations[0] / 'app.yaml', locations[1] / 'readme.md',
+                                      locations[2] / 'readme.md'])
+
+
+def test_member_which_differs_from_its_blob_is_left_to_the_downloads(tmp_path, written):
+    target = tmp_path / 'app.yaml'
+    target.write_bytes(b'old')
+
+    extracted = archives.extract_paths(build_archive({'app.yaml': b'substituted'}),
+                                       {'app.yaml': (blob_sha(b'app'), [target])})
+
+    assert extracted == {}
+    assert target.read_bytes() == b'old'
+    assert [path.name for path in tmp_path.iterdir()] == ['app.yaml']
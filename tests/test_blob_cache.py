@@ -0,0 +1,73 @@
+import time
+from pathlib import Path
+
+import pytest
+
+import blob_cache
+from blob_cache import BlobCache, hash_blob
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BlobCache(tmp_path / 'blobs')
+
+
+def save_blob(cache: BlobCache, directory: Path, content: bytes, max_size: int) -> str:
+    source = directory / 'source'
+    source.write_bytes(content)
+    sha = hash_blob(source)
+    cache.save(sha, source, max_size)
+
+    return sha
+
+
+def test_cache_stays_below_its_size(cache, tmp_path):
+    for number in range(50):
+        save_blob(cache, tmp_path, f'{number:04d}'.encode() * 250, 10000)
+
+    assert cache.size <= 10000
+    assert cache.size == sum(path.stat().st_size for path in cache.entries())
+
+
+def test_least_recently_used_blobs_are_evicted_first(cache, tmp_path):
+    shas = []
+    for number in range(9):
+        shas.append(save_blob(cache, tmp_path, f'{number:04d}'.encode() * 250, 10000))
+        time.sleep(0.01)
+
+    assert cache.copy_to(shas[0], tmp_path / 'copy')
+    time.sleep(0.01)
+    for number in range(9, 11):
+        save_blob(cache, tmp_path, f'{number:04d}'.encode() * 250, 10000)
+
+    assert cache.path(shas[0]).exists()
+    assert not cache.path(shas[1]).exists()
+
+
+def test_full_cache_is_not_scanned_on_every_save(cache, tmp_path, monkeypatch):
+    scans = []
+    glob = Path.glob
+    monkeypatch.setattr(Path, 'glob', lambda self, pattern: scans.append(pattern) or glob(self, pattern))
+
+    for number in range(100):
+        save_blob(cache, tmp_path, f'{number:04d}'.encode() * 250, 10000)
+
+    # the directory is only scanned once to build the index
+    assert len(scans) == 1
+
+
+def test_full_cache_is_evicted_below_its_size(cache, tmp_path):
+    for number in range(11):
+        save_blob(cache, tmp_path, f'{number:04d}'.encode() * 250, 10000)
+
+    assert cache.size <= 10000 * blob_cache.CACHE_LOW_WATER_MARK
+    assert len(cache.index) == len(cache.entries())
+
+
+def test_blob_edited_through_a_link_is_discarded(cache, tmp_path):
+    sha = save_blob(cache, tmp_path, b'content', 10000)
+    cache.path(sha).write_bytes(b'edited in place')
+
+    assert not cache.copy_to(sha, tmp_path / 'copy')
+    assert not cache.path(sha).exists()
+    assert cache.size == 0
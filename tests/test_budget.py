@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+import budget as budget_module
+from budget import RequestBudget
+
+
+def rate_limit_headers(remaining: int, limit: int = 5000, reset_in: float = 1000, resource: str = 'core') -> dict:
+    return {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(time.time() + reset_in), 'X-RateLimit-Resource': resource}
+
+
+@pytest.fixture
+def budget():
+    budget = RequestBudget()
+    budget.configure(50, 0.2)
+
+    return budget
+
+
+def test_buckets_are_kept_per_token(budget):
+    budget.observe('GET', 'url', 200, rate_limit_headers(4000), 'a')
+    budget.observe('GET', 'url', 200, rate_limit_headers(10), 'b')
+
+    assert budget.remaining_of('a') == 4000
+    assert budget.remaining_of('b') == 10
+    assert budget.remaining == 4010
+    assert budget.limit == 10000
+
+
+def test_other_resources_do_not_change_the_core_bucket(budget):
+    budget.observe('POST', 'url', 200, rate_limit_headers(0, resource='graphql'), 'a')
+    budget.observe('GET', 'url', 200, {}, 'a')
+
+    assert budget.remaining is None
+    assert budget.remaining_of('a') == float('inf')
+
+
+def test_exhausted_once_the_reserve_is_reached(budget):
+    budget.observe('GET', 'url', 200, rate_limit_headers(50), 'a')
+    budget.observe('GET', 'url', 200, rate_limit_headers(51), 'b')
+
+    assert budget.is_exhausted('a')
+    assert not budget.is_exhausted('b')
+    assert not budget.is_exhausted()
+
+    budget.observe('GET', 'url', 200, rate_limit_headers(20), 'b')
+
+    assert budget.is_exhausted()
+
+
+def test_a_bucket_past_its_reset_is_not_exhausted(budget):
+    budget.observe('GET', 'url', 200, rate_limit_headers(0, reset_in=-1), 'a')
+
+    assert not budget.is_exhausted('a')
+    assert budget.remaining_of('a') == float('inf')
+
+
+def test_retain_drops_buckets_of_unused_tokens(budget):
+    budget.observe('GET', 'url', 200, rate_limit_headers(0), 'a')
+    budget.retain(['b'])
+
+    assert not budget.is_exhausted()
+    assert budget.remaining is None
+
+
+def test_revoked_tokens_do_not_come_back(budget):
+    budget.observe('GET', 'url', 200, rate_limit_headers(4000), 'a')
+    budget.revoke('a')
+    budget.observe('GET', 'url', 401, rate_limit_headers(0), 'a')
+
+    assert 'a' not in budget.buckets
+    assert not budget.is_exhausted()
+
+
+def test_pace_spreads_the_remaining_requests_until_the_reset(budget, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(budget_module.time, 'sleep', sleeps.append)
+    # 1000 seconds left for the 50 requests above the reserve
+    budget.observe('GET', 'url', 200, rate_limit_headers(100, reset_in=1000), 'a')
+
+    budget.pace('GET', 'url', 'a')
+    budget.pace('GET', 'url', 'a')
+
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(20, abs=0.5)
+
+
+def test_pace_does_not_hold_back_while_the_quota_is_high(budget, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(budget_module.time, 'sleep', sleeps.append)
+    budget.observe('GET', 'url', 200, rate_limit_headers(4000), 'a')
+
+    for _ in range(5):
+        budget.pace('GET', 'url', 'a')
+    budget.pace('GET', 'url', 'unknown')
+
+    assert sleeps == []
+
+
+def test_pace_is_capped_and_stops_at_the_reserve(budget, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(budget_module.time, 'sleep', sleeps.append)
+    budget.observe('GET', 'url', 200, rate_limit_headers(51, reset_in=3600), 'a')
+
+    budget.pace('GET', 'url', 'a')
+    budget.pace('GET', 'url', 'a')
+
+    assert sleeps[0] == pytest.approx(budget_module.MAX_PACING_DELAY, abs=0.5)
+
+    # the reserve is left for the work which is already running
+    budget.observe('GET', 'url', 200, rate_limit_headers(50, reset_in=3600), 'a')
+    budget.pace('GET', 'url', 'a')
+
+    assert len(sleeps) == 1
@@ -0,0 +1,97 @@
+import io
+import json
+import time
+from pathlib import Path
+
+import pytest
+from github import RateLimitExceededException
+from urllib3 import Retry
+from urllib3.response import HTTPResponse
+
+import connection
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, 'cache_directory', tmp_path)
+    monkeypatch.setattr(connection, 'cache_max_size', 10000)
+    monkeypatch.setattr(connection, 'cache_index', None)
+
+    return tmp_path
+
+
+def test_cache_stays_below_its_size(cache):
+    for number in range(100):
+        connection.save_cache_entry(f'{number:04d}', {'text': 'x' * 500})
+
+    assert connection.cache_size <= 10000
+    assert connection.cache_size == sum(path.stat().st_size for path in cache.glob('??/*.json'))
+
+
+def test_least_recently_used_entries_are_pruned_first(cache):
+    for number in range(15):
+        connection.save_cache_entry(f'{number:04d}', {'text': 'x' * 500})
+        time.sleep(0.01)
+
+    connection.touch_cache_entry('0000')
+    time.sleep(0.01)
+    for number in range(15, 20):
+        connection.save_cache_entry(f'{number:04d}', {'text': 'x' * 500})
+
+    assert connection.read_cache_entry('0000') is not None
+    assert connection.read_cache_entry('0001') is None
+    assert connection.read_cache_entry('0019') is not None
+
+
+def test_full_cache_is_not_scanned_on_every_save(cache, monkeypatch):
+    scans = []
+    glob = Path.glob
+    monkeypatch.setattr(Path, 'glob', lambda self, pattern: scans.append(pattern) or glob(self, pattern))
+
+    for number in range(200):
+        connection.save_cache_entry(f'{number:04d}', {'text': 'x' * 500})
+
+    # the directory is only scanned once to build the index
+    assert len(scans) == 1
+
+
+def test_response_larger_than_the_cache_is_not_stored(cache):
+    connection.save_cache_entry('0000', {'text': 'x' * 20000})
+
+    assert connection.read_cache_entry('0000') is None
+
+
+def github_response(status: int, message: str, headers: dict[str, str]) -> HTTPResponse:
+    return HTTPResponse(body=io.BytesIO(json.dumps({'message': message}).encode()), status=status, reason='Forbidden',
+                        headers=headers, preload_content=False)
+
+
+def test_primary_rate_limit_is_raised_without_waiting():
+    retry = connection.PrimaryRateLimitRetry(total=3)
+    response = github_response(403, 'API rate limit exceeded for user.',
+                               {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 3600)})
+
+    with pytest.raises(RateLimitExceededException) as raised:
+        retry.increment('GET', '/repos/owner/repo', response)
+
+    assert raised.value.status == 403
+
+
+def test_secondary_rate_limit_is_retried():
+    retry = connection.PrimaryRateLimitRetry(total=3, secondary_rate_wait=5)
+    response = github_response(403, 'You have exceeded a secondary rate limit.', {'X-RateLimit-Remaining': '4000'})
+
+    retried = retry.increment('GET', '/repos/owner/repo', response)
+
+    assert isinstance(retried, connection.PrimaryRateLimitRetry)
+    assert retried.total == 2
+    assert retried.get_backoff_time() == 5
+
+
+def test_server_errors_are_retried():
+    retry = connection.PrimaryRateLimitRetry(total=3)
+
+    retried = retry.increment('GET', '/repos/owner/repo', github_response(502, 'Bad Gateway', {}))
+
+    assert isinstance(retried, Retry)
+    assert retried.total == 2
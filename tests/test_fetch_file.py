@@ -0,0 +1,163 @@
+import hashlib
+import json
+
+import pytest
+import requests
+
+import funcs
+import global_variables as gv
+
+LINK = 'https://github.com/owner/repo/blob/main/file.bin'
+CONTENT = b'0123456789' * 10
+
+
+def blob_sha(content: bytes) -> str:
+    return hashlib.sha1(f'blob {len(content)}\0'.encode() + content).hexdigest()
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes, etag: str | None = '"v1"', broken: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {'ETag': etag} if etag else {}
+        self.broken = broken
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.content), 10):
+            yield self.content[start:start + 10]
+
+        if self.broken:
+            raise requests.ConnectionError('connection reset')
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # every call takes the next response and records the headers it was sent with
+    server = {'responses': [], 'headers': []}
+
+    def open_raw_stream(owner_name, repo_name, branch, path, extra_headers=None):
+        server['headers'].append(extra_headers or {})
+        return server['responses'].pop(0)
+
+    monkeypatch.setattr(funcs, 'open_raw_stream', open_raw_stream)
+    monkeypatch.setattr(funcs, 'RESUME_MIN_SIZE', 20)
+
+    return server
+
+
+def write_part(target, content: bytes, etag: str = '"v1"', sha: str | None = None) -> None:
+    part, state = funcs.part_paths(target)
+    part.write_bytes(content)
+    state.write_text(json.dumps({'link': LINK, 'blob_sha': sha, 'etag': etag}))
+
+
+def test_fresh_download_replaces_the_target(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    server['responses'].append(FakeResponse(200, CONTENT))
+
+    assert funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT)) == \
+        (blob_sha(CONTENT), True)
+    assert target.read_bytes() == CONTENT
+    assert server['headers'] == [{}]
+    assert not any(path.exists() for path in funcs.part_paths(target))
+
+
+def test_part_is_resumed_with_if_range(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    write_part(target, CONTENT[:40], sha=blob_sha(CONTENT))
+    server['responses'].append(FakeResponse(206, CONTENT[40:]))
+
+    funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    assert server['headers'] == [{'Range': 'bytes=40-', 'If-Range': '"v1"'}]
+    assert target.read_bytes() == CONTENT
+
+
+def test_changed_file_is_downloaded_from_the_start(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    changed = b'changed' * 10
+    write_part(target, CONTENT[:40])
+    # the ETag of the range no longer matches, so the server sends the whole new version
+    server['responses'].append(FakeResponse(200, changed, etag='"v2"'))
+
+    funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target)
+
+    assert target.read_bytes() == changed
+
+
+def test_part_of_another_version_is_not_resumed(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    write_part(target, b'x' * 40, sha=blob_sha(b'other'))
+    server['responses'].append(FakeResponse(200, CONTENT))
+
+    funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    assert server['headers'] == [{}]
+    assert target.read_bytes() == CONTENT
+
+
+def test_resumed_part_which_does_not_match_is_fetched_whole(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    write_part(target, b'x' * 40, sha=blob_sha(CONTENT))
+    server['responses'] += [FakeResponse(206, CONTENT[40:]), FakeResponse(200, CONTENT)]
+
+    funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    assert server['headers'] == [{'Range': 'bytes=40-', 'If-Range': '"v1"'}, {}]
+    assert target.read_bytes() == CONTENT
+
+
+def test_interrupted_download_keeps_its_part(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    server['responses'].append(FakeResponse(200, CONTENT[:50], broken=True))
+
+    with pytest.raises(requests.ConnectionError):
+        funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    part, state = funcs.part_paths(target)
+    assert part.read_bytes() == CONTENT[:50]
+    assert json.loads(state.read_text()) == {'link': LINK, 'blob_sha': blob_sha(CONTENT), 'etag': '"v1"'}
+    assert not target.exists()
+
+    server['responses'].append(FakeResponse(206, CONTENT[50:]))
+    funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    assert server['headers'][-1] == {'Range': 'bytes=50-', 'If-Range': '"v1"'}
+    assert target.read_bytes() == CONTENT
+
+
+def test_small_or_weakly_tagged_parts_are_dropped(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    server['responses'] += [FakeResponse(200, CONTENT[:10], broken=True),
+                            FakeResponse(200, CONTENT[:50], etag='W/"v1"', broken=True)]
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target)
+
+        assert not any(path.exists() for path in funcs.part_paths(target))
+
+
+def test_download_which_does_not_match_its_blob_is_rejected(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    target.write_bytes(b'old')
+    server['responses'].append(FakeResponse(200, b'unexpected'))
+
+    with pytest.raises(gv.WarningException):
+        funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target, blob_sha(CONTENT))
+
+    assert target.read_bytes() == b'old'
+    assert not any(path.exists() for path in funcs.part_paths(target))
+
+
+def test_identical_content_leaves_the_target_alone(server, tmp_path):
+    target = tmp_path / 'file.bin'
+    target.write_bytes(CONTENT)
+    modified = target.stat().st_mtime_ns
+    server['responses'].append(FakeResponse(200, CONTENT))
+
+    assert funcs.fetch_file('owner', 'repo', 'main', 'file.bin', target) == (blob_sha(CONTENT), False)
+    assert target.stat().st_mtime_ns == modified
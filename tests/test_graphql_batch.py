@@ -0,0 +1,90 @@
+import json
+import re
+
+from graphql_batch import build_query, query_cost, run_query, split_batches
+
+
+def batch_shape(batches: list) -> list[list[tuple[str, int]]]:
+    return [[(key[0], len(paths)) for key, paths in batch] for batch in batches]
+
+
+def test_cost_counts_the_repository_the_branch_and_every_path():
+    assert query_cost([]) == 2
+    assert query_cost(['a', 'b', 'c']) == 5
+
+
+def test_branches_share_a_query_up_to_the_cost():
+    groups = {('a', 'repo', 'main'): ['1', '2', '3'], ('b', 'repo', 'main'): ['1', '2', '3']}
+
+    assert batch_shape(split_batches(groups, 10)) == [[('a', 3), ('b', 3)]]
+    assert batch_shape(split_batches(groups, 9)) == [[('a', 3)], [('b', 3)]]
+
+
+def test_branch_with_more_paths_than_a_query_holds_is_split():
+    groups = {('a', 'repo', 'main'): [str(number) for number in range(10)], ('b', 'repo', 'main'): ['1']}
+
+    batches = split_batches(groups, 6)
+
+    assert batch_shape(batches) == [[('a', 4)], [('a', 4)], [('a', 2)], [('b', 1)]]
+    assert [path for batch in batches[:3] for key, paths in batch for path in paths] == \
+        [str(number) for number in range(10)]
+    assert all(sum(query_cost(paths) for key, paths in batch) <= 6 for batch in batches)
+
+
+def test_cost_below_a_single_path_still_makes_progress():
+    groups = {('a', 'repo', 'main'): ['1', '2']}
+
+    assert batch_shape(split_batches(groups, 1)) == [[('a', 1)], [('a', 1)]]
+
+
+def test_no_branches_make_no_queries():
+    assert split_batches({}, 200) == []
+
+
+def test_query_uses_an_alias_per_repository_and_path():
+    query = build_query([(('a', 'repo', 'main'), ['x.txt', 'y.txt']), (('b', 'other', 'dev'), ['z.txt'])])
+
+    assert re.findall(r'\b(r\d+|f\d+):', query) == ['r0', 'f0', 'f1', 'r1', 'f0']
+    assert 'r0: repository(owner: "a", name: "repo")' in query
+    assert 'head: ref(qualifiedName: "refs/heads/dev")' in query
+
+
+def test_quotes_and_backslashes_are_escaped():
+    path = 'dir/say "hi"\\back\\slash.txt'
+    branch = 'feature/"quoted"'
+
+    query = build_query([(('owner', 'repo', branch), [path])])
+    literals = [json.loads(literal) for literal in re.findall(r'"(?:[^"\\]|\\.)*"', query)]
+
+    assert f'{branch}:{path}' in literals
+    assert f'refs/heads/{branch}' in literals
+    assert query.count('{') == query.count('}')
+
+
+class FakeRequester:
+    graphql_url = 'https://api.github.com/graphql'
+
+    def __init__(self):
+        self.queries = []
+
+    def requestJsonAndCheck(self, verb: str, url: str, input: dict) -> tuple[dict, dict]:
+        self.queries.append((verb, url, input['query']))
+        return {}, {'data': {'r0': None}}
+
+
+class FakeClient:
+    def __init__(self):
+        self.requester = FakeRequester()
+        self.repositories = []
+
+    def get_repo(self, name: str, lazy: bool = False):
+        self.repositories.append((name, lazy))
+        return type('LazyRepository', (), {'_requester': self.requester})()
+
+
+def test_batch_is_sent_with_the_client_it_was_split_for():
+    client = FakeClient()
+
+    assert run_query(client, [(('owner', 'repo', 'main'), ['a.txt'])]) == {'r0': None}
+    assert client.repositories == [('owner/repo', True)]
+    assert [(verb, url) for verb, url, query in client.requester.queries] == [('POST', FakeRequester.graphql_url)]
@@ -0,0 +1,65 @@
+import pytest
+
+import global_variables as gv
+import scheduler
+
+
+def tracked_file(file_id: int, poll_interval: float | None = None) -> list:
+    return ['owner', 'repo', 'main', f'file{file_id}.txt', 'location', file_id, 0, None, poll_interval, None, None]
+
+
+@pytest.fixture
+def learned(monkeypatch):
+    learned = []
+    updates = []
+
+    def learn_interval(owner_name, repo_name, branch, path):
+        learned.append(path)
+        return 3600.0
+
+    monkeypatch.setattr(scheduler, 'learn_interval', learn_interval)
+    monkeypatch.setattr(scheduler.store, 'update_tracked_files', updates.extend)
+
+    return learned, updates
+
+
+def test_intervals_are_learned_for_synced_files(learned):
+    paths, updates = learned
+
+    scheduler.reschedule_tracked_files([(tracked_file(1), gv.SuccessException('')),
+                                        (tracked_file(2), gv.UpToDateException(''))])
+
+    assert paths == ['file1.txt', 'file2.txt']
+    assert [update['poll_interval'] for update in updates] == [3600.0, 3600.0]
+
+
+def test_failed_and_deferred_files_are_not_looked_up(learned):
+    paths, updates = learned
+
+    scheduler.reschedule_tracked_files([(tracked_file(1), gv.DeferredException('')),
+                                        (tracked_file(2), gv.ErrorException('')),
+                                        (tracked_file(3), gv.WarningException(''))])
+
+    assert paths == []
+    # the interval stays unknown, so it is learned after the next sync
+    assert all('poll_interval' not in update for update in updates)
+    assert len(updates) == 3
+
+
+def test_no_intervals_are_learned_while_the_budget_is_exhausted(learned, monkeypatch):
+    paths, updates = learned
+    monkeypatch.setattr(scheduler.token_pool, 'is_exhausted', lambda owner_name=None: True)
+
+    scheduler.reschedule_tracked_files([(tracked_file(1), gv.SuccessException(''))])
+
+    assert paths == []
+    assert 'poll_interval' not in updates[0]
+
+
+def test_known_intervals_grow_without_requests(learned):
+    paths, updates = learned
+
+    scheduler.reschedule_tracked_files([(tracked_file(1, 600.0), gv.UpToDateException(''))])
+
+    assert paths == []
+    assert updates[0]['poll_interval'] == scheduler.next_interval(600.0, gv.UpToDateException(''))
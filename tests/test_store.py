@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+from contextlib import closing
+
+import pytest
+
+import store
+
+
+def test_files_txt_is_migrated_once(data_directory):
+    (data_directory / 'files.txt').write_text(
+        'owner repo main src/a.py /home/user/my files\n'
+        'owner repo dev b.txt downloaded\n'
+        'broken line\n')
+
+    files = store.read_tracked_files()
+
+    assert [file[:5] for file in files] == [['owner', 'repo', 'main', 'src/a.py', '/home/user/my files'],
+                                            ['owner', 'repo', 'dev', 'b.txt', 'downloaded']]
+    assert not (data_directory / 'files.txt').exists()
+    assert (data_directory / 'files.txt.migrated').exists()
+
+    # a files.txt which shows up again after the migration is not imported a second time
+    (data_directory / 'files.txt').write_text('owner repo main c.txt downloaded\n')
+
+    assert len(store.read_tracked_files()) == 2
+
+
+def test_migrations_set_the_schema_version(data_directory):
+    store.read_tracked_files()
+
+    with closing(sqlite3.connect(data_directory / 'files.db')) as connection:
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == len(store.MIGRATIONS)
+
+
+def test_migrated_entries_get_links(data_directory):
+    (data_directory / 'files.txt').write_text('owner repo main src/a.py downloaded\n')
+    store.read_tracked_files()
+
+    assert len(store.find_tracked_files_by_link('https://github.com/owner/repo/blob/main/src/a.py')) == 1
+
+
+
+def test_failed_migration_is_rolled_back(data_directory, monkeypatch):
+    monkeypatch.setattr(store, 'MIGRATIONS', [*store.MIGRATIONS, '''
+    CREATE TABLE half_applied (id INTEGER PRIMARY KEY);
+    ALTER TABLE missing_table ADD COLUMN value TEXT;
+    '''])
+
+    with pytest.raises(sqlite3.OperationalError):
+        store.connect()
+
+    with closing(sqlite3.connect(data_directory / 'files.db')) as connection:
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == 0
+        assert connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall() == []
+
+
+def test_failed_import_is_repeated_by_the_next_connect(data_directory, monkeypatch):
+    (data_directory / 'files.txt').write_text('owner repo main a.txt downloaded\n')
+    insert_tracked_files = store.insert_tracked_files
+
+    def broken_insert(connection, entries, tree_id=None):
+        raise sqlite3.OperationalError('disk I/O error')
+
+    monkeypatch.setattr(store, 'insert_tracked_files', broken_insert)
+
+    with pytest.raises(sqlite3.OperationalError):
+        store.read_tracked_files()
+
+    assert (data_directory / 'files.txt').exists()
+
+    monkeypatch.setattr(store, 'insert_tracked_files', insert_tracked_files)
+
+    assert [file[3] for file in store.read_tracked_files()] == ['a.txt']
+    assert not (data_directory / 'files.txt').exists()
+
+
+def test_concurrent_connections_migrate_once(data_directory):
+    (data_directory / 'files.txt').write_text('owner repo main a.txt downloaded\n')
+    errors = []
+
+    def read():
+        try:
+            store.read_tracked_files()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store.read_tracked_files()) == 1
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from github import Github
+
+import global_variables as gv
+import graphql_batch
+import tokens
+from budget import RequestBudget
+from tokens import TokenPool, identify_token
+
+
+def observe(budget: RequestBudget, token: str, remaining: int, status: int = 200) -> None:
+    budget.observe('GET', 'url', status, {'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': str(remaining),
+                                          'X-RateLimit-Reset': str(time.time() + 1000)}, identify_token(token))
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    budget = RequestBudget()
+    budget.configure(50, 0.2)
+    monkeypatch.setattr(tokens, 'budget', budget)
+
+    return budget
+
+
+@pytest.fixture
+def clients():
+    return {'first': Github(), 'second': Github(), 'private': Github()}
+
+
+@pytest.fixture
+def pool(budget, clients):
+    pool = TokenPool()
+    pool.configure([('first', clients['first'], []), ('second', clients['second'], []),
+                    ('private', clients['private'], ['My-Company'])])
+
+    return pool
+
+
+def test_unconfigured_pool_uses_the_login_client(budget):
+    assert TokenPool().client_for('owner') is gv.git
+
+
+def test_first_token_is_used_while_none_was_measured(pool, clients):
+    assert pool.client_for('owner') is clients['first']
+
+
+def test_token_with_the_most_requests_left_is_used(pool, budget, clients):
+    observe(budget, 'first', 100)
+    observe(budget, 'second', 3000)
+    observe(budget, 'private', 4000)
+
+    assert pool.client_for('owner') is clients['private']
+    assert pool.client_for(None) is clients['private']
+
+
+def test_pinned_owner_keeps_its_token(pool, budget, clients):
+    observe(budget, 'first', 4000)
+    observe(budget, 'second', 4000)
+    observe(budget, 'private', 10)
+
+    # owners are compared without case
+    assert pool.client_for('my-company') is clients['private']
+
+
+def test_pinned_owner_is_deferred_alone_when_its_token_ran_out(pool, budget):
+    observe(budget, 'first', 4000)
+    observe(budget, 'private', 10)
+
+    assert pool.is_exhausted('My-Company')
+    assert not pool.is_exhausted('owner')
+    assert not budget.is_exhausted()
+
+
+def test_revoked_token_leaves_the_rotation(pool, budget, clients):
+    observe(budget, 'first', 4000)
+    pool.observe('GET', 'url', 401, {}, identify_token('first'))
+    observe(budget, 'first', 4000, status=401)
+
+    assert pool.client_for('owner') is clients['second']
+    assert identify_token('first') not in budget.buckets
+
+
+def test_pinned_owner_falls_back_once_its_token_was_revoked(pool, clients):
+    pool.observe('GET', 'url', 401, {}, identify_token('private'))
+
+    assert pool.client_for('my-company') is clients['first']
+
+
+def test_rejected_pool_raises_instead_of_using_a_revoked_token(pool):
+    for token in ('first', 'second', 'private'):
+        pool.observe('GET', 'url', 401, {}, identify_token(token))
+
+    with pytest.raises(gv.ErrorException):
+        pool.client_for('owner')
+
+    assert not pool.is_exhausted('owner')
+
+
+def test_configure_clears_revoked_tokens(pool, clients):
+    pool.observe('GET', 'url', 401, {}, identify_token('first'))
+    pool.configure([('first', clients['first'], [])])
+
+    assert pool.client_for('owner') is clients['first']
+
+
+def test_graphql_batches_are_split_by_token(pool, clients, monkeypatch):
+    monkeypatch.setattr(graphql_batch, 'token_pool', pool)
+    groups = {('owner', 'repo', 'main'): ['a'], ('my-company', 'secret', 'main'): ['b'],
+              ('other', 'repo', 'main'): ['c']}
+
+    assert graphql_batch.split_by_client(groups) == [
+        (clients['first'], {('owner', 'repo', 'main'): ['a'], ('other', 'repo', 'main'): ['c']}),
+        (clients['private'], {('my-company', 'secret', 'main'): ['b']})]
@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import funcs
+import store
+import trees
+
+
+def matching(glob: str, paths: list[str]) -> list[str]:
+    expression = trees.glob_to_regex(glob)
+
+    return [path for path in paths if expression.fullmatch(path)]
+
+
+def test_split_pattern_tracks_everything_below_a_directory():
+    assert trees.split_pattern('configs/app') == ('configs/app', 'configs/app/**')
+    assert trees.split_pattern('/configs/') == ('configs', 'configs/**')
+
+
+def test_split_pattern_keeps_the_directory_before_the_first_glob():
+    assert trees.split_pattern('configs/**/*.yaml') == ('configs', 'configs/**/*.yaml')
+    assert trees.split_pattern('*.md') == ('', '*.md')
+
+
+def test_star_does_not_cross_directories():
+    assert matching('docs/*.md', ['docs/a.md', 'docs/sub/b.md', 'docs/a.txt']) == ['docs/a.md']
+
+
+def test_double_star_matches_any_depth():
+    paths = ['configs/a.yaml', 'configs/x/b.yaml', 'configs/x/y/c.yaml', 'configs/x/c.yml', 'other/d.yaml']
+
+    assert matching('configs/**/*.yaml', paths) == ['configs/a.yaml', 'configs/x/b.yaml', 'configs/x/y/c.yaml']
+    assert matching('configs/**', paths) == ['configs/a.yaml', 'configs/x/b.yaml', 'configs/x/y/c.yaml',
+                                             'configs/x/c.yml']
+
+
+def test_question_mark_and_character_classes():
+    paths = ['v1.txt', 'v2.txt', 'v10.txt', 'va.txt']
+
+    assert matching('v?.txt', paths) == ['v1.txt', 'v2.txt', 'va.txt']
+    assert matching('v[0-9].txt', paths) == ['v1.txt', 'v2.txt']
+    assert matching('v[!0-9].txt', paths) == ['va.txt']
+
+
+def test_special_characters_are_literal():
+    assert matching('a+b (1).txt', ['a+b (1).txt', 'aab (1).txt']) == ['a+b (1).txt']
+
+
+def test_members_keep_their_subdirectories():
+    assert trees.member_location('/target', 'configs', 'configs/x/b.yaml') == Path('/target/x')
+    assert trees.member_location('/target', '', 'a.md') == Path('/target')
+
+
+def test_expansion_adds_files_once_and_leaves_tracked_ones_alone(data_directory):
+    location = data_directory / 'location'
+    location.mkdir()
+    store.save_tracked_files([('owner', 'repo', 'main', 'd/a.txt', str(location))])
+    tree = store.save_tracked_tree('owner', 'repo', 'main', 'd', str(location))
+    listing = {'d/a.txt': 'sha-a', 'd/b.txt': 'sha-b', 'e/c.txt': 'sha-c'}
+
+    assert [str(message) for message in trees.expand_tracked_tree(tree, listing)] == \
+        ['File "d/b.txt" was added to the tracked tree "https://github.com/owner/repo/tree/main/d".']
+    assert trees.expand_tracked_tree(tree, listing) == []
+    assert [file[3] for file in store.read_tree_members(tree[0])] == ['d/b.txt']
+
+
+def test_deleting_a_tree_keeps_files_tracked_on_their_own(data_directory):
+    location = data_directory / 'location'
+    location.mkdir()
+    store.save_tracked_files([('owner', 'repo', 'main', 'd/a.txt', str(location))])
+    tree = store.save_tracked_tree('owner', 'repo', 'main', 'd', str(location))
+    trees.expand_tracked_tree(tree, {'d/a.txt': 'sha-a', 'd/b.txt': 'sha-b'})
+
+    assert store.delete_tracked_tree_by_link(tree[6]) == 1
+    assert [file[3] for file in store.read_tracked_files()] == ['d/a.txt']
+
+
+def test_removed_members_are_only_deleted_in_their_location(data_directory, tmp_path, monkeypatch):
+    default_directory = tmp_path / 'downloaded'
+    default_directory.mkdir()
+    monkeypatch.setattr(funcs, 'DOWNLOADED_DIRECTORY_PATH', default_directory)
+    location = data_directory / 'location'
+    tree = store.save_tracked_tree('owner', 'repo', 'main', 'd', str(location))
+    trees.expand_tracked_tree(tree, {'d/a.txt': 'sha-a', 'd/sub/b.txt': 'sha-b'})
+    (location / 'a.txt').write_text('a')
+    (default_directory / 'b.txt').write_text('unrelated')
+
+    # the directory of b.txt is gone, the file of the same name in the default directory is not its copy
+    (location / 'sub').rmdir()
+
+    messages = trees.expand_tracked_tree(tree, {})
+
+    assert len(messages) == 2
+    assert not (location / 'a.txt').exists()
+    assert (default_directory / 'b.txt').read_text() == 'unrelated'
+    assert store.read_tree_members(tree[0]) == []
@@ -0,0 +1,192 @@
+import pytest
+from github import GithubException, UnknownObjectException
+
+import funcs
+import global_variables as gv
+import updater
+
+
+def tracked_file(owner_name: str, path: str, file_id: int, priority: int = 0, last_checked: float | None = None) \
+        -> list:
+    return [owner_name, 'repo', 'main', path, 'location', file_id, priority, last_checked, None, None, None]
+
+
+def test_order_puts_high_priority_first():
+    files = [tracked_file('a', 'low', 1, 0), tracked_file('a', 'high', 2, 10), tracked_file('a', 'middle', 3, 5)]
+
+    assert [file[3] for file in updater.order_tracked_files(files)] == ['high', 'middle', 'low']
+
+
+def test_order_puts_files_checked_longest_ago_first():
+    files = [tracked_file('a', 'recent', 1, 0, 300.0), tracked_file('a', 'old', 2, 0, 100.0),
+             tracked_file('a', 'never', 3, 0, None)]
+
+    assert [file[3] for file in updater.order_tracked_files(files)] == ['never', 'old', 'recent']
+
+
+def test_order_accepts_rows_without_metadata():
+    files = [['a', 'repo', 'main', 'first', 'location'], tracked_file('a', 'second', 2, 1)]
+
+    assert [file[3] for file in updater.order_tracked_files(files)] == ['second', 'first']
+
+
+def test_update_follows_the_priority_across_branches(monkeypatch):
+    updated = []
+
+    def update_tracked_file(owner_name, repo_name, branch, path, location, remote_sha=None):
+        updated.append(path)
+        return gv.SuccessException(path)
+
+    monkeypatch.setattr(updater, 'read_rest_freshness',
+                        lambda groups, executor: ({key: None for key in groups}, {}, set()))
+    monkeypatch.setattr(updater, 'update_tracked_file', update_tracked_file)
+    monkeypatch.setattr(updater.store, 'update_tracked_files', lambda updates: None)
+    monkeypatch.setattr(updater, 'save_blob_hashes', lambda: None)
+    monkeypatch.setattr(updater, 'sync_written_files', lambda: None)
+
+    # the branch of the most important file also holds the least important one
+    files = [tracked_file('first', 'first-low', 1, 0), tracked_file('second', 'second-middle', 2, 5),
+             tracked_file('first', 'first-high', 3, 10)]
+
+    results = list(updater.update_tracked_files(files, workers=1))
+
+    assert updated == ['first-high', 'second-middle', 'first-low']
+    assert all(isinstance(result, gv.SuccessException) for file, result in results)
+
+
+@pytest.mark.parametrize('error, result_type', [(GithubException(502), gv.WarningException),
+                                                (GithubException(403), gv.WarningException),
+                                                (UnknownObjectException(404), gv.ErrorException)])
+def test_failed_check_is_not_remembered_as_synced(error, result_type, tmp_path, monkeypatch):
+    def get_remote_blob_sha(owner_name, repo_name, branch, path):
+        raise error
+
+    monkeypatch.setattr(funcs, 'get_remote_blob_sha', get_remote_blob_sha)
+    (tmp_path / 'file.txt').write_text('local')
+    file = tracked_file('owner', 'file.txt', 1)
+    file[4] = str(tmp_path)
+
+    result = updater.update_tracked_file(*file[:5])
+
+    assert isinstance(result, result_type)
+    assert updater.describe_result(file, result, None, 'new-head') is None
+
+
+class FakeComparison:
+    def __init__(self, status: str, files: list):
+        self.status = status
+        self.files = files
+
+
+class FakeChangedFile:
+    def __init__(self, filename: str, sha: str | None, status: str = 'modified', previous_filename: str | None = None):
+        self.filename = filename
+        self.sha = sha
+        self.status = status
+        self.previous_filename = previous_filename
+
+
+class FakeRepository:
+    def __init__(self, comparison):
+        self.comparison = comparison
+
+    def compare(self, base: str, head: str):
+        if isinstance(self.comparison, Exception):
+            raise self.comparison
+        return self.comparison
+
+
+def synced_file(path: str, file_id: int, location: str, synced_head: str = 'old') -> list:
+    return ['owner', 'repo', 'main', path, location, file_id, 0, None, None, None, synced_head]
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    # the branch moved from "old" to "new", the compare result and the listing are set by every test
+    remote = {'changes': None, 'listing': {}, 'listed': [], 'compared': []}
+
+    def read_changed_paths(owner_name, repo_name, base, head):
+        remote['compared'].append((base, head))
+        return remote['changes']
+
+    def read_remote_blob_shas(owner_name, repo_name, head):
+        remote['listed'].append(head)
+        return remote['listing']
+
+    monkeypatch.setattr(updater, 'resolve_branch_head', lambda owner_name, repo_name, branch: 'new')
+    monkeypatch.setattr(updater, 'read_changed_paths', read_changed_paths)
+    monkeypatch.setattr(updater, 'read_remote_blob_shas', read_remote_blob_shas)
+
+    return remote
+
+
+def read_freshness(files: list[list]) -> tuple:
+    with updater.ThreadPoolExecutor(max_workers=2) as executor:
+        return updater.read_rest_freshness(updater.group_tracked_files(files), executor)
+
+
+def test_compare_delta_marks_only_changed_paths(remote, tmp_path):
+    remote['changes'] = {'a.txt': 'sha-a2', 'untracked.txt': 'sha-u'}
+    files = [synced_file('a.txt', 1, str(tmp_path)), synced_file('b.txt', 2, str(tmp_path))]
+
+    heads, remote_shas, unchanged = read_freshness(files)
+
+    assert heads == {('owner', 'repo', 'main'): 'new'}
+    assert remote_shas[('owner', 'repo', 'main')] == {'a.txt': 'sha-a2'}
+    assert unchanged == {2}
+    assert remote['compared'] == [('old', 'new')]
+    assert remote['listed'] == []
+
+
+def test_compare_delta_downloads_only_changed_tracked_files(remote, tmp_path, monkeypatch):
+    updated = []
+    remote['changes'] = {'a.txt': 'sha-a2'}
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / 'b.txt').write_text('b')
+
+    def update_tracked_file(owner_name, repo_name, branch, path, location, remote_sha=None):
+        updated.append((path, remote_sha))
+        return gv.SuccessException(path)
+
+    monkeypatch.setattr(updater, 'update_tracked_file', update_tracked_file)
+    monkeypatch.setattr(updater.store, 'update_tracked_files', lambda updates: None)
+    monkeypatch.setattr(updater, 'save_blob_hashes', lambda: None)
+    monkeypatch.setattr(updater, 'sync_written_files', lambda: None)
+
+    results = dict((file[3], result) for file, result in updater.update_tracked_files(
+        [synced_file('a.txt', 1, str(tmp_path)), synced_file('b.txt', 2, str(tmp_path))], workers=1))
+
+    assert updated == [('a.txt', 'sha-a2')]
+    assert isinstance(results['b.txt'], gv.UpToDateException)
+
+
+@pytest.mark.parametrize('comparison', [FakeComparison('diverged', []),
+                                        FakeComparison('ahead', [FakeChangedFile(f'{number}.txt', 'sha')
+                                                                 for number in range(updater.MAX_COMPARE_FILES)]),
+                                        GithubException(502)])
+def test_unusable_compare_results_are_not_used(comparison, monkeypatch):
+    monkeypatch.setattr(updater.token_pool, 'get_repo', lambda owner_name, repo_name: FakeRepository(comparison))
+
+    assert updater.read_changed_paths('owner', 'repo', 'old', 'new') is None
+
+
+def test_compare_lists_removed_and_renamed_paths(monkeypatch):
+    comparison = FakeComparison('ahead', [FakeChangedFile('a.txt', 'sha-a'),
+                                          FakeChangedFile('gone.txt', None, 'removed'),
+                                          FakeChangedFile('new.txt', 'sha-n', 'renamed', 'old.txt')])
+    monkeypatch.setattr(updater.token_pool, 'get_repo', lambda owner_name, repo_name: FakeRepository(comparison))
+
+    assert updater.read_changed_paths('owner', 'repo', 'old', 'new') == \
+        {'a.txt': 'sha-a', 'gone.txt': None, 'new.txt': 'sha-n', 'old.txt': None}
+
+
+def test_missing_delta_falls_back_to_one_listing_per_branch(remote, tmp_path):
+    remote['listing'] = {'a.txt': 'sha-a2', 'b.txt': 'sha-b'}
+    files = [synced_file('a.txt', 1, str(tmp_path)), synced_file('b.txt', 2, str(tmp_path)),
+             synced_file('c.txt', 3, str(tmp_path), synced_head=None)]
+
+    heads, remote_shas, unchanged = read_freshness(files)
+
+    assert remote_shas[('owner', 'repo', 'main')] == {'a.txt': 'sha-a2', 'b.txt': 'sha-b'}
+    assert unchanged == set()
+    assert remote['listed'] == ['new']
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import http.client
+import json
+import threading
+
+import pytest
+
+import webhook
+
+SECRET = 'secret'
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def push(commits: list[dict], ref: str = 'refs/heads/main') -> dict:
+    return {'ref': ref, 'repository': {'name': 'repo', 'owner': {'login': 'owner'}}, 'commits': commits}
+
+
+@pytest.fixture
+def tracked(monkeypatch):
+    files = [['owner', 'repo', 'main', 'src/a.py', 'location', 1],
+             ['owner', 'repo', 'main', 'docs/b.md', 'location', 2]]
+
+    def find_tracked_files_by_branch(owner_name, repo_name, branch):
+        return files if (owner_name, repo_name, branch) == ('owner', 'repo', 'main') else []
+
+    monkeypatch.setattr(webhook.store, 'find_tracked_files_by_branch', find_tracked_files_by_branch)
+
+    return files
+
+
+@pytest.fixture
+def server(tracked):
+    server = webhook.WebhookServer('127.0.0.1', 0, SECRET, lambda files: None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def post(server: webhook.WebhookServer, body: bytes, headers: dict[str, str]) -> tuple[int, str]:
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+
+    try:
+        connection.putrequest('POST', '/')
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+
+        return response.status, response.read().decode()
+    finally:
+        connection.close()
+
+
+def test_valid_signature_is_accepted():
+    assert webhook.verify_signature(SECRET, b'{}', sign(b'{}'))
+
+
+@pytest.mark.parametrize('signature', [None, '', sign(b'{}', 'other'), sign(b'{ }'),
+                                       'sha1=' + hashlib.sha1(b'{}').hexdigest()])
+def test_bad_signatures_are_rejected(signature):
+    assert not webhook.verify_signature(SECRET, b'{}', signature)
+
+
+def test_missing_secret_rejects_every_signature():
+    assert not webhook.verify_signature('', b'{}', sign(b'{}', ''))
+
+
+def test_push_selects_only_changed_tracked_paths(tracked):
+    payload = push([{'added': ['new.txt'], 'modified': ['src/a.py'], 'removed': ['docs/b.md']},
+                    {'added': [], 'modified': ['README.md'], 'removed': []}])
+
+    assert webhook.changed_tracked_files(payload) == [tracked[0]]
+
+
+def test_push_without_commits_checks_every_tracked_file(tracked):
+    assert webhook.changed_tracked_files(push([])) == tracked
+
+
+def test_pushes_to_tags_and_deleted_branches_are_ignored(tracked):
+    assert webhook.changed_tracked_files(push([{'modified': ['src/a.py']}], ref='refs/tags/v1')) == []
+    assert webhook.changed_tracked_files({**push([{'modified': ['src/a.py']}]), 'deleted': True}) == []
+
+
+def test_push_to_an_untracked_branch_selects_nothing(tracked):
+    assert webhook.changed_tracked_files(push([{'modified': ['src/a.py']}], ref='refs/heads/dev')) == []
+
+
+def test_signed_push_queues_the_changed_files(server, tracked):
+    body = json.dumps(push([{'modified': ['src/a.py', 'other.txt']}])).encode()
+
+    status, message = post(server, body, {'Content-Length': str(len(body)), 'X-GitHub-Event': 'push',
+                                          'X-Hub-Signature-256': sign(body)})
+
+    assert status == 202
+    assert server.jobs.get_nowait() == [tracked[0]]
+
+
+def test_unsigned_push_is_refused(server):
+    body = json.dumps(push([{'modified': ['src/a.py']}])).encode()
+
+    status, message = post(server, body, {'Content-Length': str(len(body)), 'X-GitHub-Event': 'push',
+                                          'X-Hub-Signature-256': sign(body, 'other')})
+
+    assert status == 401
+    assert server.jobs.empty()
+
+
+@pytest.mark.parametrize('length, status', [('abc', 400), ('-1', 400), (str(webhook.MAX_PAYLOAD_SIZE + 1), 413)])
+def test_invalid_or_huge_bodies_are_refused_before_they_are_read(server, length, status):
+    assert post(server, b'', {'Content-Length': length, 'X-GitHub-Event': 'push'})[0] == status
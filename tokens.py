@@ -0,0 +1,95 @@
+import threading
+
+from github import Github
+from github.Auth import Token
+from github.Repository import Repository
+
+import global_variables as gv
+from budget import budget
+from connection import response_hooks, token_identity
+
+
+def identify_token(token: str | None) -> str:
+    # the digest matches the one the hooks receive for requests with this token
+    return token_identity({'Authorization': f'{Token(token).token_type} {token}'} if token else {})
+
+
+class TokenPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients: dict[str, Github] = {}
+        self.pins: dict[str, str] = {}
+        self.revoked: set[str] = set()
+
+    def configure(self, clients: list[tuple[str | None, Github, list[str]]]) -> None:
+        with self.lock:
+            self.clients = {identify_token(token): client for token, client, owners in clients}
+            self.pins = {owner.lower(): identify_token(token) for token, client, owners in clients for owner in owners}
+            self.revoked = set()
+
+        budget.retain(list(self.clients))
+
+    def identity_for(self, owner_name: str | None = None) -> str | None:
+        with self.lock:
+            usable = [identity for identity in self.clients if identity not in self.revoked]
+            pinned = self.pins.get((owner_name or '').lower())
+            configured = bool(self.clients)
+
+        # without a pool every request goes through the client the application logged in with
+        if not configured:
+            return None
+
+        # the login client holds a revoked token too, falling back to it would only repeat the rejected requests
+        if not usable:
+            raise gv.ErrorException('All tokens were rejected by Github. Enter a new secure token.')
+
+        # a pinned owner keeps its token even when it ran out, the other tokens may not see its private repositories
+        if pinned in usable:
+            return pinned
+
+        # the first token with the most requests left wins, so a single token behaves as before
+        return max(usable, key=budget.remaining_of)
+
+    def client_for(self, owner_name: str | None = None) -> Github:
+        identity = self.identity_for(owner_name)
+
+        return gv.git if identity is None else self.clients[identity]
+
+    def is_exhausted(self, owner_name: str | None = None) -> bool:
+        # the token an owner is served by decides, a pinned token which ran out defers its owner alone
+        try:
+            identity = self.identity_for(owner_name)
+        except gv.GeneralException:
+            return False
+
+        return budget.is_exhausted() if identity is None else budget.is_exhausted(identity)
+
+    def get_repo(self, owner_name: str, repo_name: str, lazy: bool = True) -> Repository:
+        return self.client_for(owner_name).get_repo(f'{owner_name}/{repo_name}', lazy=lazy)
+
+    def observe(self, verb: str, url: str, status: int, headers, identity: str) -> None:
+        # a revoked or expired token is taken out of the rotation until the credentials are read again
+        if status == 401 and identity in self.clients:
+            with self.lock:
+                self.revoked.add(identity)
+
+            budget.revoke(identity)
+
+    def describe(self) -> list[dict]:
+        with self.lock:
+            identities = list(self.clients)
+            revoked = set(self.revoked)
+            owners = {identity: sorted(owner for owner, pinned in self.pins.items() if pinned == identity)
+                      for identity in identities}
+
+        with budget.lock:
+            buckets = {identity: budget.buckets.get(identity) for identity in identities}
+
+        return [{'token': identity[:12], 'owners': owners[identity], 'revoked': identity in revoked,
+                 'limit': buckets[identity].limit if buckets[identity] else None,
+                 'remaining': buckets[identity].remaining if buckets[identity] else None} for identity in identities]
+
+
+token_pool = TokenPool()
+
+response_hooks.append(token_pool.observe)
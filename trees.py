@@ -0,0 +1,130 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+import global_variables as gv
+import store
+from funcs import read_setting
+from global_variables import GeneralException
+from scheduler import add_jitter
+from updater import read_remote_blob_shas
+
+GLOB_CHARACTERS = '*?['
+
+
+def split_pattern(pattern: str) -> tuple[str, str]:
+    parts = [part for part in pattern.split('/') if part]
+    base = []
+
+    for part in parts:
+        if any(character in part for character in GLOB_CHARACTERS):
+            break
+        base.append(part)
+
+    # a plain directory tracks everything below it
+    glob = '/'.join(parts) if len(base) < len(parts) else '/'.join(base + ['**'])
+
+    return '/'.join(base), glob
+
+
+def glob_to_regex(glob: str) -> re.Pattern:
+    expression = ''
+    index = 0
+
+    while index < len(glob):
+        if glob.startswith('**/', index):
+            expression += '(?:[^/]+/)*'
+            index += 3
+        elif glob.startswith('**', index):
+            expression += '.*'
+            index += 2
+        elif glob[index] == '*':
+            expression += '[^/]*'
+            index += 1
+        elif glob[index] == '?':
+            expression += '[^/]'
+            index += 1
+        elif glob[index] == '[' and ']' in glob[index + 2:]:
+            end = glob.index(']', index + 2)
+            expression += '[' + glob[index + 1:end].replace('!', '^', 1).replace('\\', '\\\\') + ']'
+            index = end + 1
+        else:
+            expression += re.escape(glob[index])
+            index += 1
+
+    return re.compile(expression)
+
+
+def member_location(location: str, base: str, path: str) -> Path:
+    # members keep their directories relative to the tracked directory
+    return Path(location) / PurePosixPath(path).relative_to(PurePosixPath(base)).parent
+
+
+def expand_tracked_tree(tree: list, listing: dict[str, str]) -> list[GeneralException]:
+    tree_id, owner_name, repo_name, branch, pattern, location, link = tree[:7]
+    base, glob = split_pattern(pattern)
+    expression = glob_to_regex(glob)
+
+    paths = {path for path in listing if expression.fullmatch(path)}
+    members = store.read_tree_members(tree_id)
+    added = sorted(paths - {file[3] for file in members})
+    removed = [file for file in members if file[3] not in paths]
+    messages = []
+
+    entries = []
+    for path in added:
+        target = member_location(location, base, path)
+        target.mkdir(parents=True, exist_ok=True)
+        entries.append((owner_name, repo_name, branch, path, str(target)))
+
+    for path in store.save_tree_members(tree_id, entries):
+        messages.append(gv.InfoException(f'File "{path}" was added to the tracked tree "{link}".'))
+
+    # files which disappeared upstream are deleted locally as well, a member whose directory is gone has no
+    # local copy, the default directory may hold an unrelated file of the same name
+    for file in removed:
+        if Path(file[4]).is_dir():
+            (Path(file[4]) / PurePosixPath(file[3]).name).unlink(missing_ok=True)
+        messages.append(gv.InfoException(f'File "{file[3]}" was deleted from the tracked tree "{link}".'))
+    store.delete_tracked_files_by_id([file[5] for file in removed])
+
+    return messages
+
+
+def expand_tracked_trees(trees: list[list]) -> list[GeneralException]:
+    if not trees:
+        return []
+
+    groups = {}
+    for tree in trees:
+        groups.setdefault((tree[1], tree[2], tree[3]), []).append(tree)
+
+    # one recursive listing of a branch serves every tree tracked in it
+    with ThreadPoolExecutor(max_workers=max(1, min(read_setting('workers'), len(groups)))) as executor:
+        listings = dict(zip(groups, executor.map(lambda key: read_remote_blob_shas(*key), groups)))
+
+    messages = []
+    updates = []
+    for key, group in groups.items():
+        for tree in group:
+            # a truncated listing would look like deleted members, such trees are left as they are
+            if listings[key] is None:
+                messages.append(gv.WarningException(
+                    f'Tracked tree "{tree[6]}" was not expanded, the branch "{key[2]}" could not be listed.'))
+            else:
+                messages.extend(expand_tracked_tree(tree, listings[key]))
+
+            updates.append({'id': tree[0], 'next_due': time.time() + add_jitter(read_setting('poll_interval_min'))})
+
+    store.update_tracked_trees(updates)
+
+    return messages
+
+
+def expand_due_tracked_trees() -> list[GeneralException]:
+    return expand_tracked_trees(store.read_due_tracked_trees(time.time()))
+
+
+def expand_all_tracked_trees() -> list[GeneralException]:
+    return expand_tracked_trees(store.read_tracked_trees())
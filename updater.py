@@ -0,0 +1,265 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator
+
+from github import GithubException
+
+import global_variables as gv
+import store
+from archives import update_from_archive
+from budget import budget
+from funcs import check_download, download_file, read_setting, resolve_target, save_blob_hashes, sync_written_files
+from global_variables import GeneralException
+from graphql_batch import read_freshness
+from tokens import token_pool
+
+# the compare API lists at most this many changed files, a longer diff is read from the tree listing instead
+MAX_COMPARE_FILES = 300
+
+
+def update_tracked_file(owner_name: str, repo_name: str, branch: str, path: str, location: str,
+                        remote_sha: str | None = None) -> GeneralException:
+    try:
+        if not check_download(owner_name, repo_name, branch, path, location, remote_sha):
+            return gv.UpToDateException(f'File "{path}" is up to date.')
+
+        # the result of a download is always raised
+        download_file(owner_name, repo_name, branch, path, location, remote_sha)
+    except GeneralException as e:
+        return e
+    except Exception as e:
+        return gv.ErrorException(f'File "{path}" was not updated: {e}')
+
+
+def group_tracked_files(files: list[list[str]]) -> dict[tuple[str, str, str], list[list[str]]]:
+    groups = {}
+
+    for file in files:
+        groups.setdefault((file[0], file[1], file[2]), []).append(file)
+
+    return groups
+
+
+def resolve_branch_head(owner_name: str, repo_name: str, branch: str) -> str | None:
+    try:
+        return token_pool.get_repo(owner_name, repo_name).get_branch(branch).commit.sha
+    except (GithubException, GeneralException, OSError):
+        return None
+
+
+def read_remote_blob_shas(owner_name: str, repo_name: str, head: str) -> dict[str, str] | None:
+    try:
+        tree = token_pool.get_repo(owner_name, repo_name).get_git_tree(head, recursive=True)
+    except (GithubException, GeneralException, OSError):
+        return None
+
+    # a truncated listing is incomplete, files are then checked one by one
+    if tree.raw_data.get('truncated'):
+        return None
+
+    return {element.path: element.sha for element in tree.tree if element.type == 'blob'}
+
+
+def read_changed_paths(owner_name: str, repo_name: str, base: str, head: str) -> dict[str, str | None] | None:
+    try:
+        comparison = token_pool.get_repo(owner_name, repo_name).compare(base, head)
+    except (GithubException, GeneralException, OSError):
+        return None
+
+    # after a force push the diff from the merge base misses what was dropped, the tree listing is read instead
+    if comparison.status not in ('ahead', 'identical') or len(comparison.files) >= MAX_COMPARE_FILES:
+        return None
+
+    changes = {}
+    for file in comparison.files:
+        # removed files have no blob anymore, renamed ones are gone from their previous path
+        changes[file.filename] = None if file.status == 'removed' else file.sha
+        if file.previous_filename:
+            changes[file.previous_filename] = None
+
+    return changes
+
+
+def read_rest_freshness(groups: dict[tuple[str, str, str], list[list]], executor: ThreadPoolExecutor) \
+        -> tuple[dict[tuple[str, str, str], str | None], dict[tuple[str, str, str], dict[str, str] | None], set[int]]:
+    heads = dict(zip(groups, executor.map(
+        lambda key: None if token_pool.is_exhausted(key[0]) else resolve_branch_head(*key), groups)))
+    stale = {key: [file for file in group if not is_synced(file, heads[key])]
+             for key, group in groups.items() if heads[key] is not None}
+
+    # one compare call per branch and last synced commit lists the paths which changed since then
+    bases = list({(key, file[10]) for key, files in stale.items() for file in files if len(file) > 10 and file[10]})
+    changes = dict(zip(bases, executor.map(
+        lambda item: None if token_pool.is_exhausted(item[0][0])
+        else read_changed_paths(*item[0][:2], item[1], heads[item[0]]), bases)))
+
+    remote_shas = {}
+    unchanged = set()
+    listed = []
+    for key, files in stale.items():
+        shas = remote_shas.setdefault(key, {})
+
+        for file in files:
+            delta = changes.get((key, file[10])) if len(file) > 10 and file[10] else None
+
+            if delta is None:
+                listed.append(key)
+            elif file[3] in delta:
+                shas[file[3]] = delta[file[3]]
+            else:
+                unchanged.add(file[5])
+
+    # files without a usable diff fall back to one recursive tree listing of their branch
+    listed = list(dict.fromkeys(listed))
+    listings = dict(zip(listed, executor.map(
+        lambda key: None if token_pool.is_exhausted(key[0]) else read_remote_blob_shas(key[0], key[1], heads[key]),
+        listed)))
+    for key, listing in listings.items():
+        if listing is not None:
+            remote_shas[key].update(listing)
+
+    return heads, remote_shas, unchanged
+
+
+def describe_result(file: list, result: GeneralException, blob_sha: str | None, head: str | None) -> dict | None:
+    if len(file) < 6 or isinstance(result, (gv.ErrorException, gv.WarningException)):
+        return None
+
+    update = {'id': file[5], 'last_checked': time.time()}
+
+    # the head is remembered per file, so failed files and files outside of this cycle are checked again
+    if head is not None:
+        update['synced_head'] = head
+    if blob_sha is not None:
+        update['blob_sha'] = blob_sha
+    if not isinstance(result, gv.UpToDateException):
+        update['last_updated'] = update['last_checked']
+
+    return update
+
+
+def is_synced(file: list, head: str | None) -> bool:
+    return head is not None and len(file) > 10 and file[10] == head
+
+
+def order_tracked_files(files: list[list]) -> list[list]:
+    # higher priority first, then the files which were checked the longest time ago, so a cycle which was
+    # stopped by the rate limit resumes with the files it did not reach
+    return sorted(files, key=lambda file: (-(file[6] if len(file) > 6 else 0),
+                                           file[7] if len(file) > 7 and file[7] is not None else 0))
+
+
+def select_archive_files(queue: list[tuple[tuple[str, str, str], list]], heads: dict[tuple[str, str, str], str | None],
+                         remote_shas: dict[tuple[str, str, str], dict[str, str] | None], threshold: int) \
+        -> dict[tuple[str, str, str], list[list]]:
+    if threshold <= 0:
+        return {}
+
+    changed = {}
+    for key, file in queue:
+        remote_sha = (remote_shas.get(key) or {}).get(file[3])
+
+        # only files whose new blob is known and differs from the local copy count, so no request is made here
+        if heads[key] is not None and remote_sha is not None and check_download(*file[:5], remote_sha):
+            changed.setdefault(key, []).append(file)
+
+    return {key: files for key, files in changed.items() if len(files) >= threshold}
+
+
+def defer_tracked_file(file: list) -> GeneralException:
+    return gv.DeferredException(f'File "{file[3]}" was deferred until the rate limit resets at {budget.reset_time()}.')
+
+
+def update_tracked_files(files: list[list], workers: int | None = None) \
+        -> Iterator[tuple[list, GeneralException]]:
+    if not files:
+        return
+
+    workers = workers or read_setting('workers')
+    budget.configure(read_setting('rate_limit_reserve'), read_setting('rate_limit_pacing'))
+    files = order_tracked_files(files)
+    # groups only share the head, compare and listing lookups, the work itself follows the global order
+    groups = group_tracked_files(files)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files)))) as executor:
+        if read_setting('freshness_backend') == 'graphql':
+            # heads and blob SHAs of many branches come from a few batched queries
+            heads, remote_shas = read_freshness({key: [file[3] for file in group] for key, group in groups.items()})
+            unchanged = set()
+        else:
+            heads, remote_shas, unchanged = read_rest_freshness(groups, executor)
+        queue = []
+        updates = []
+
+        for file in files:
+            key = (file[0], file[1], file[2])
+
+            # the file did not change since it was synced, it is only downloaded when missing locally
+            if (is_synced(file, heads[key]) or len(file) > 5 and file[5] in unchanged) \
+                    and resolve_target(file[4], file[3]).exists():
+                result = gv.UpToDateException(f'File "{file[3]}" is up to date.')
+                updates.append(describe_result(file, result, None, heads[key]))
+                yield file, result
+            else:
+                queue.append((key, file))
+
+        futures = {}
+        archives = {}
+
+        # a branch with many changed files is fetched as a single archive of its head commit
+        selected = {key: files for key, files in
+                    select_archive_files(queue, heads, remote_shas, read_setting('archive_threshold')).items()
+                    if not token_pool.is_exhausted(key[0])}
+        taken = {id(file) for files in selected.values() for file in files}
+        queue = [(key, file) for key, file in queue if id(file) not in taken]
+
+        for key, files in selected.items():
+            archives[executor.submit(update_from_archive, key[0], key[1], heads[key], files,
+                                     remote_shas[key])] = key, files
+
+        queue.reverse()
+
+        try:
+            while queue or futures or archives:
+                # work is submitted a little ahead of the workers, so the budget is checked close to its use
+                while queue and len(futures) < workers * 2:
+                    key, file = queue.pop()
+
+                    # an owner pinned to a token which ran out is deferred while the other tokens go on
+                    if token_pool.is_exhausted(file[0]):
+                        yield file, defer_tracked_file(file)
+                        continue
+
+                    shas = remote_shas.get(key) or {}
+                    futures[executor.submit(update_tracked_file, *file[:5], shas.get(file[3]))] = key, file
+
+                if not futures and not archives:
+                    continue
+
+                done, _ = wait([*futures, *archives], return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in archives:
+                        key, files = archives.pop(future)
+
+                        for file, result in zip(files, future.result()):
+                            # a file which was missing from the archive or differed from its blob is downloaded alone
+                            if result is None:
+                                queue.append((key, file))
+                                continue
+
+                            updates.append(describe_result(file, result, remote_shas[key].get(file[3]), heads[key]))
+                            yield file, result
+                        continue
+
+                    key, file = futures.pop(future)
+                    result = future.result()
+                    updates.append(describe_result(file, result, (remote_shas.get(key) or {}).get(file[3]),
+                                                   heads[key]))
+
+                    yield file, result
+        finally:
+            # metadata of the whole cycle is written in a single transaction
+            store.update_tracked_files([update for update in updates if update is not None])
+            save_blob_hashes()
+            sync_written_files()
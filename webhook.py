@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+import json
+import queue
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable
+
+import store
+
+MAX_PAYLOAD_COMMITS = 2048
+# GitHub caps webhook payloads at 25 MB, a larger body is rejected before it is read
+MAX_PAYLOAD_SIZE = 25 * 1024 * 1024
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    return hmac.compare_digest(expected, signature.removeprefix('sha256='))
+
+
+def changed_tracked_files(payload: dict) -> list[list]:
+    ref = payload.get('ref', '')
+    repository = payload.get('repository') or {}
+    owner = repository.get('owner') or {}
+
+    if not ref.startswith('refs/heads/') or payload.get('deleted'):
+        return []
+
+    owner_name = owner.get('login') or owner.get('name')
+    files = store.find_tracked_files_by_branch(owner_name, repository.get('name'), ref.removeprefix('refs/heads/'))
+
+    commits = payload.get('commits') or []
+
+    # a force push may come without commits and GitHub lists at most 2048 of them, such pushes check every file
+    if not commits or len(commits) >= MAX_PAYLOAD_COMMITS:
+        return files
+
+    paths = set()
+    for commit in commits:
+        paths.update(commit.get('added') or [])
+        paths.update(commit.get('modified') or [])
+
+    return [file for file in files if file[3] in paths]
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: 'WebhookServer'
+
+    def do_POST(self) -> None:
+        length = self.headers.get('Content-Length', '0')
+
+        if not length.isascii() or not length.isdigit():
+            self.reply(400, 'Invalid Content-Length.')
+            return
+        if int(length) > MAX_PAYLOAD_SIZE:
+            self.reply(413, 'Payload is too large.')
+            return
+
+        body = self.rfile.read(int(length))
+
+        if not verify_signature(self.server.secret, body, self.headers.get('X-Hub-Signature-256')):
+            self.reply(401, 'Invalid signature.')
+            return
+
+        event = self.headers.get('X-GitHub-Event')
+        if event == 'ping':
+            self.reply(200, 'pong')
+            return
+        if event != 'push':
+            self.reply(202, f'Event "{event}" is ignored.')
+            return
+
+        try:
+            files = changed_tracked_files(json.loads(body))
+        except (json.JSONDecodeError, AttributeError):
+            self.reply(400, 'Invalid payload.')
+            return
+
+        if files:
+            self.server.jobs.put(files)
+        self.reply(202, f'{len(files)} tracked files were queued.')
+
+    def reply(self, status: int, message: str) -> None:
+        body = message.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, secret: str, update: Callable[[list[list]], None]):
+        super().__init__((host, port), WebhookHandler)
+        self.secret = secret
+        self.jobs = queue.Queue()
+        self.update = update
+
+    def work(self) -> None:
+        # files are updated one push at a time, the request itself is answered right away
+        while True:
+            files = self.jobs.get()
+
+            try:
+                self.update(files)
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        threading.Thread(target=self.work, daemon=True).start()